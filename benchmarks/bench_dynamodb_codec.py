@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark della conversione DynamoDB <-> Python e dell'accesso ai path
+======================================================================
+
+Confronta TypeSerializer/TypeDeserializer di boto3 con i convertitori non ricorsivi
+di mylib su item con annidamento profondo e migliaia di chiavi, e l'accessor
+compilato (compile_key_path) con lo split del path a ogni lookup.
+
+Uso:
+    python3 benchmarks/bench_dynamodb_codec.py [chiavi] [profondità] [ripetizioni]
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault('MYLIB_LAZY_INIT', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mylib  # noqa: E402
+
+
+def build_item(keys, depth):
+    """Item con una mappa di `keys` entry e una catena di `depth` mappe annidate"""
+    nested = {'leaf': 'value', 'numbers': list(range(10))}
+    for level in range(depth):
+        nested = {f'level{level}': nested, 'flag': True}
+    return {
+        'sw_thing_type': 'thing',
+        'CP_map': {f'CP{i:05d}': str(i) for i in range(keys)},
+        'nested': nested,
+    }
+
+
+def timed(label, func, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        func()
+    elapsed = (time.perf_counter() - start) / runs * 1000
+    print(f"   {label:<34}{elapsed:9.3f} ms")
+    return elapsed
+
+
+def main():
+    keys = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    runs = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+    serializer, deserializer = TypeSerializer(), TypeDeserializer()
+
+    native = build_item(keys, depth)
+    wire = mylib.serialize_dynamodb_item(native)
+    assert mylib.deserialize_dynamodb_item(wire) == mylib.deserialize_dynamodb_item(
+        {k: serializer.serialize(v) for k, v in native.items()})
+
+    print(f"📊 item con {keys} chiavi e profondità {depth} ({runs} ripetizioni, tempo medio)")
+    boto_ser = timed("serialize   boto3", lambda: {k: serializer.serialize(v) for k, v in native.items()}, runs)
+    fast_ser = timed("serialize   mylib", lambda: mylib.serialize_dynamodb_item(native), runs)
+    boto_de = timed("deserialize boto3", lambda: {k: deserializer.deserialize(v) for k, v in wire.items()}, runs)
+    fast_de = timed("deserialize mylib", lambda: mylib.deserialize_dynamodb_item(wire), runs)
+
+    items = [wire] * 10000
+    split = timed("lookup 10k split per chiamata", lambda: [mylib.get_nested_value(it, "sw_thing_type.S".split('.')) for it in items], runs)
+    accessor = mylib.compile_key_path("sw_thing_type.S")
+    compiled = timed("lookup 10k compile_key_path", lambda: [accessor(it) for it in items], runs)
+
+    print(f"   speedup serialize x{boto_ser / fast_ser:.1f}, deserialize x{boto_de / fast_de:.1f}, lookup x{split / compiled:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
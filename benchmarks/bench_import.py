@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark del tempo di import di mylib
+======================================
+
+Confronta l'import classico (auto-configurazione SSO al primo import) con la
+modalità lazy (MYLIB_LAZY_INIT=1), eseguendo ogni import in un interprete nuovo.
+
+Uso:
+    python3 benchmarks/bench_import.py [ripetizioni]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+LIBRARY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(lazy, runs):
+    """Restituisce i tempi (in ms) di `import mylib` in processi separati"""
+    env = dict(os.environ)
+    env['MYLIB_LAZY_INIT'] = '1' if lazy else '0'
+    code = (
+        "import sys, time; sys.path.insert(0, %r); t = time.perf_counter(); "
+        "import mylib; print('\\nIMPORT_MS', (time.perf_counter() - t) * 1000)" % LIBRARY_DIR
+    )
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', code],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+        )
+        lines = [l for l in result.stdout.splitlines() if l.startswith('IMPORT_MS ')]
+        if result.returncode != 0 or not lines:
+            print(f"❌ Import fallito (lazy={lazy}): {result.stderr.strip()}")
+            return timings
+        timings.append(float(lines[-1].split()[1]))
+    return timings
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    start = time.perf_counter()
+    eager = measure(False, runs)
+    lazy = measure(True, runs)
+    if not eager or not lazy:
+        return 1
+
+    print(f"📊 import mylib ({runs} ripetizioni, mediana)")
+    print(f"   eager : {statistics.median(eager):8.1f} ms")
+    print(f"   lazy  : {statistics.median(lazy):8.1f} ms")
+    print(f"   speedup: x{statistics.median(eager) / max(statistics.median(lazy), 0.001):.1f}")
+    print(f"⏱️  Durata complessiva: {time.perf_counter() - start:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark del listing S3 seriale vs shardato
+============================================
+
+Usa uno stand-in S3 in memoria (nessuna chiamata AWS) che simula la latenza di
+ogni pagina di list_objects_v2, e confronta iterS3Objects (seriale) con
+listS3ObjectsSharded (sotto-prefissi listati in parallelo).
+
+Uso:
+    python3 benchmarks/bench_s3_listing.py [oggetti] [latenza_ms] [max_workers]
+"""
+
+import bisect
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault('MYLIB_LAZY_INIT', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mylib  # noqa: E402
+
+
+class InMemoryS3:
+    """Stand-in minimale di un client S3: solo il paginator di list_objects_v2"""
+
+    def __init__(self, keys, latency):
+        now = datetime.now(timezone.utc)
+        self.keys = sorted(keys)
+        self.objects = {k: {'Key': k, 'LastModified': now - timedelta(minutes=i), 'Size': 1}
+                        for i, k in enumerate(keys)}
+        self.latency = latency
+
+    def get_paginator(self, operation):
+        assert operation == 'list_objects_v2'
+        return self
+
+    def paginate(self, Bucket, Prefix='', Delimiter=None, PaginationConfig=None):
+        page_size = (PaginationConfig or {}).get('PageSize') or 1000
+        start = bisect.bisect_left(self.keys, Prefix)
+        page = {'Contents': [], 'CommonPrefixes': []}
+        seen_prefixes = set()
+        for key in self.keys[start:]:
+            if not key.startswith(Prefix):
+                break
+            if Delimiter and Delimiter in key[len(Prefix):]:
+                common = key[:key.index(Delimiter, len(Prefix)) + 1]
+                if common in seen_prefixes:
+                    continue
+                seen_prefixes.add(common)
+                page['CommonPrefixes'].append({'Prefix': common})
+            else:
+                page['Contents'].append(self.objects[key])
+            if len(page['Contents']) + len(page['CommonPrefixes']) >= page_size:
+                time.sleep(self.latency)
+                yield page
+                page = {'Contents': [], 'CommonPrefixes': []}
+        time.sleep(self.latency)
+        yield page
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+
+    keys = [f"export/CP/{i % 32:02d}/file_{i:07d}.json" for i in range(total)]
+    s3 = InMemoryS3(keys, latency)
+
+    start = time.perf_counter()
+    serial = mylib._newestObjects(mylib.iterS3Objects('bucket', 'export/CP', 'file', s3=s3), 50)
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sharded = mylib.listS3ObjectsSharded('bucket', 'export/CP', 'file', max_files=50, max_workers=workers, s3=s3)
+    sharded_time = time.perf_counter() - start
+
+    assert [o['Key'] for o in serial] == [o['Key'] for o in sharded]
+    print(f"📊 listing di {total} oggetti, latenza {latency * 1000:.0f} ms/pagina, {workers} worker")
+    print(f"   seriale : {serial_time:6.2f} s")
+    print(f"   shardato: {sharded_time:6.2f} s")
+    print(f"   speedup : x{serial_time / sharded_time:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
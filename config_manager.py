@@ -1,16 +1,74 @@
+import copy
+import functools
 import json
 import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
+_MISSING = object()
+
+
+@functools.lru_cache(maxsize=1024)
+def _split_key_path(key_path):
+    """Chiavi di un path separato da punti, calcolate una sola volta per path"""
+    return tuple(key_path.split('.'))
+
+
+def _assign(config, keys, value):
+    """Imposta value nel dizionario annidato seguendo keys, creando i livelli mancanti"""
+    for key in keys[:-1]:
+        if key not in config:
+            config[key] = {}
+        config = config[key]
+    config[keys[-1]] = value
+
+
+@contextmanager
+def _locked_file(path):
+    """Lock esclusivo tra processi sul file <path>.lock (fcntl su POSIX, msvcrt su Windows)"""
+    with open(f"{path}.lock", 'a+') as lock_file:
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            import msvcrt
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
 
 class ConfigManager:
-    """Gestisce la configurazione per mylib.py (shared in library)"""
+    """Gestisce la configurazione per mylib.py (shared in library)
+
+    Il file viene letto al primo accesso e riletto automaticamente quando cambia il suo mtime
+    (controllato al più ogni `check_interval` secondi), così i servizi di lunga durata vedono le
+    modifiche senza riavvio; i valori letti con get restano in cache fino al reload successivo.
+
+    I salvataggi sono atomici (file temporaneo + rename) e serializzati tra processi da un lock
+    file: se nel frattempo un altro processo ha salvato, le modifiche fatte con set vengono
+    riapplicate sulla versione più recente del file invece di sovrascriverla. Con batch() più
+    modifiche vengono scritte con un'unica scrittura.
+    """
     
-    def __init__(self, config_path=None):
-        """Inizializza il configuration manager
+    def __init__(self, config_path=None, check_interval=1.0):
+        """Inizializza il configuration manager (senza leggere il file)
         
         Args:
             config_path: Path al file di configurazione (opzionale)
+            check_interval: Secondi minimi tra due controlli dell'mtime del file (0 = a ogni accesso)
         """
         if config_path is None:
             # Cerca il file di configurazione nella stessa directory di questo file
@@ -18,7 +76,44 @@ class ConfigManager:
             config_path = current_dir / "mylib_config.json"
         
         self.config_path = Path(config_path)
-        self._config = self._load_config()
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._config_data = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lookups = {}
+        self._pending = []
+        self._batch_depth = 0
+        self._save_requested = False
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            return None
+
+    @property
+    def _config(self):
+        """Configurazione corrente: caricata al primo accesso, ricaricata se il file è cambiato"""
+        now = time.monotonic()
+        if self._config_data is not None and now - self._checked_at < self.check_interval:
+            return self._config_data
+        with self._lock:
+            self._checked_at = now
+            mtime = self._file_mtime()
+            # Le modifiche locali non ancora salvate hanno la precedenza su quelle del file
+            if self._config_data is None or (mtime != self._mtime and not self._pending):
+                self._config_data = self._load_config()
+                self._mtime = mtime
+                self._lookups = {}
+            return self._config_data
+
+    def reload(self):
+        """Forza la rilettura del file, scartando le modifiche non salvate"""
+        with self._lock:
+            self._config_data = None
+            self._pending = []
+            return self._config
     
     def _load_config(self):
         """Carica la configurazione dal file JSON"""
@@ -61,14 +156,17 @@ class ConfigManager:
         Returns:
             Il valore dalla configurazione o il default
         """
-        keys = key_path.split('.')
-        value = self._config
-        
-        for key in keys:
-            if isinstance(value, dict) and key in value:
-                value = value[key]
-            else:
-                return default
+        config = self._config
+        lookups = self._lookups
+        value = lookups.get(key_path, _MISSING)
+        if value is _MISSING:
+            value = config
+            for key in _split_key_path(key_path):
+                if isinstance(value, dict) and key in value:
+                    value = value[key]
+                else:
+                    return default
+            lookups[key_path] = value
         
         return value
     
@@ -79,25 +177,85 @@ class ConfigManager:
             key_path: Chiave con path separato da punti
             value: Valore da impostare
         """
-        keys = key_path.split('.')
-        config = self._config
-        
-        for key in keys[:-1]:
-            if key not in config:
-                config[key] = {}
-            config = config[key]
-        
-        config[keys[-1]] = value
+        keys = _split_key_path(key_path)
+        with self._lock:
+            _assign(self._config, keys, value)
+            self._pending.append((keys, value))
+            self._lookups = {}
     
     def save(self):
-        """Salva la configurazione corrente nel file"""
-        try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(self._config, f, indent=2, ensure_ascii=False)
-            return True
-        except Exception as e:
-            print(f"⚠️ Errore nel salvataggio della configurazione: {e}")
-            return False
+        """Salva la configurazione corrente nel file (dentro un batch, alla fine del batch)"""
+        with self._lock:
+            if self._batch_depth:
+                self._save_requested = True
+                return True
+            try:
+                self._write()
+                return True
+            except Exception as e:
+                print(f"⚠️ Errore nel salvataggio della configurazione: {e}")
+                return False
+
+    def _write(self):
+        """Scrive la configurazione in modo atomico, sotto lock tra processi"""
+        self._config  # assicura che la configurazione sia caricata
+        with _locked_file(self.config_path):
+            if self._file_mtime() != self._mtime:
+                # Un altro processo ha salvato: si riparte dal file e si riapplicano le modifiche locali
+                data = self._load_config()
+                for keys, value in self._pending:
+                    _assign(data, keys, value)
+                self._config_data = data
+            directory = self.config_path.parent
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{self.config_path.name}.", suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self._config_data, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                try:
+                    os.chmod(tmp_path, os.stat(self.config_path).st_mode & 0o777)
+                except FileNotFoundError:
+                    os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, self.config_path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            self._mtime = self._file_mtime()
+        self._pending = []
+        self._lookups = {}
+
+    @contextmanager
+    def batch(self):
+        """Contesto transazionale: le modifiche fatte al suo interno vengono salvate con un'unica
+        scrittura all'uscita, oppure annullate se il blocco solleva un'eccezione.
+
+        Esempio:
+            with config.batch():
+                config.update_aws_sso_path(path)
+                config.update_region('eu-west-1')
+        """
+        with self._lock:
+            snapshot = copy.deepcopy(self._config)
+            pending = list(self._pending)
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._config_data = snapshot
+                self._pending = pending
+                self._lookups = {}
+                if self._batch_depth == 1:
+                    self._save_requested = False
+                raise
+            finally:
+                self._batch_depth -= 1
+            if not self._batch_depth and (self._pending or self._save_requested):
+                self._save_requested = False
+                self._write()
     
     def get_aws_sso_path(self):
         """Ottiene il path del AWS SSO Credential Manager"""
@@ -122,5 +280,5 @@ class ConfigManager:
         return self.save()
 
 
-# Istanza globale del configuration manager
+# Istanza globale del configuration manager (il file viene letto al primo accesso)
 config = ConfigManager()
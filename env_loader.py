@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+📄 Caricamento del file .env
+============================
+
+Loader unico del file .env usato da mylib e da setup_aws_sso: il file viene letto
+una sola volta e il risultato resta in cache finché path, mtime e dimensione non
+cambiano. Supporta commenti, prefisso `export` e valori tra apici singoli o doppi.
+"""
+
+import os
+import threading
+
+_lock = threading.Lock()
+_parsed = {}    # path -> (firma del file, valori)
+_applied = {}   # path -> firma del file già applicata a os.environ
+_found = {}     # directory corrente -> path del .env trovato
+
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '"': '"', '\\': '\\'}
+
+
+def _signature(path):
+    """Firma (mtime, dimensione) del file, None se non esiste"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _search_dirs():
+    current_dir = os.getcwd()
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    search_dirs = [current_dir, module_dir, os.path.dirname(module_dir)]
+    parent_dir = os.path.dirname(current_dir)
+    if parent_dir != current_dir:
+        search_dirs.append(parent_dir)
+    return search_dirs
+
+
+def find_env_file():
+    """Cerca il file .env nella directory corrente, in quella della libreria e nelle rispettive directory padre.
+
+    Il file trovato è memorizzato per directory corrente; se sparisce la ricerca viene ripetuta. Un esito
+    negativo non viene memorizzato, così un .env creato in seguito viene trovato alla chiamata successiva.
+    """
+    cwd = os.getcwd()
+    with _lock:
+        cached = _found.get(cwd)
+        if cached is not None and os.path.isfile(cached):
+            return cached
+        for search_dir in _search_dirs():
+            env_file = os.path.join(search_dir, '.env')
+            if os.path.isfile(env_file):
+                _found[cwd] = env_file
+                return env_file
+        _found.pop(cwd, None)
+        return None
+
+
+def _unquote(value):
+    """Rimuove apici e commenti in linea da un valore del .env"""
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+        inner = value[1:-1]
+        if value[0] == "'":
+            return inner
+        chars, i = [], 0
+        while i < len(inner):
+            if inner[i] == '\\' and i + 1 < len(inner) and inner[i + 1] in _ESCAPES:
+                chars.append(_ESCAPES[inner[i + 1]])
+                i += 2
+            else:
+                chars.append(inner[i])
+                i += 1
+        return ''.join(chars)
+    # Nei valori non quotati " #" inizia un commento
+    comment = value.find(' #')
+    if comment != -1:
+        value = value[:comment]
+    return value.strip()
+
+
+def parse_env_lines(lines):
+    """Converte le righe di un file .env in un dizionario chiave -> valore"""
+    values = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('export '):
+            line = line[len('export '):].lstrip()
+        if '=' not in line:
+            continue
+        key, value = line.split('=', 1)
+        key = key.strip()
+        if key:
+            values[key] = _unquote(value.strip())
+    return values
+
+
+def parse_env_file(path):
+    """Valori del file .env (dizionario vuoto se non leggibile), riletto solo se il file è cambiato"""
+    signature = _signature(path)
+    if signature is None:
+        return {}
+    with _lock:
+        cached = _parsed.get(path)
+        if cached and cached[0] == signature:
+            return dict(cached[1])
+    try:
+        with open(path, 'r') as f:
+            values = parse_env_lines(f)
+    except (OSError, UnicodeDecodeError):
+        # Un .env illeggibile non deve bloccare chi lo carica
+        return {}
+    with _lock:
+        _parsed[path] = (signature, values)
+    return dict(values)
+
+
+def load_env_file(path=None, override=True, force=False):
+    """Carica in os.environ i valori del .env (default: quello trovato da find_env_file).
+
+    Il file viene applicato solo se è cambiato dall'ultima volta (o con force=True); con
+    override=False le variabili già presenti nell'ambiente non vengono sovrascritte.
+    Restituisce i valori letti.
+    """
+    path = path or find_env_file()
+    if not path:
+        return {}
+    values = parse_env_file(path)
+    signature = _signature(path)
+    with _lock:
+        if not force and _applied.get(path) == signature:
+            return values
+        _applied[path] = signature
+    for key, value in values.items():
+        if override or key not in os.environ:
+            os.environ[key] = value
+    return values
+
+
+def invalidate(path=None):
+    """Dimentica la cache (di un file o di tutti), ad esempio dopo aver creato o riscritto un .env"""
+    with _lock:
+        if path is None:
+            _parsed.clear()
+            _applied.clear()
+        else:
+            _parsed.pop(path, None)
+            _applied.pop(path, None)
+        _found.clear()
@@ -1,155 +1,538 @@
 #import requests
 #import argparse
-import configparser
 import os
+import functools
+import heapq
+import itertools
 import re
 import time
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-import tkinter as tk
-from tkinter import filedialog
 import json
-import boto3
 import platform
+import queue
+import random
 import sys
+from typing import NamedTuple, Optional
 
-# Import inquirer per menu interattivi (frecce)
+# Loader condiviso del file .env (stesso modulo usato da setup_aws_sso)
 try:
-    import inquirer
-    INQUIRER_AVAILABLE = True
-except Exception:
-    INQUIRER_AVAILABLE = False
+    from . import env_loader
+except ImportError:
+    import env_loader
+
+# Modalità di inizializzazione lazy (MYLIB_LAZY_INIT=1): l'import del modulo definisce solo le funzioni,
+# mentre ricerca del .env, import di credential_manager e setup SSO avvengono al primo utilizzo.
+# boto3, tkinter e inquirer vengono comunque importati solo quando servono.
+LAZY_INIT = os.environ.get('MYLIB_LAZY_INIT', '').strip().lower() in ('1', 'true', 'yes', 'si')
+
+# Modalità non interattiva (MYLIB_HEADLESS=1, per scheduler e CI): nessun prompt, dialog o attesa; home directory,
+# profilo SSO e ruolo arrivano da argomenti o da MYLIB_HOME_DIR / MYLIB_PROFILE / MYLIB_ROLE, e le condizioni che
+# richiederebbero l'intervento dell'utente sollevano eccezioni tipizzate invece di chiamare sys.exit.
+HEADLESS = os.environ.get('MYLIB_HEADLESS', '').strip().lower() in ('1', 'true', 'yes', 'si')
+
+
+class CredentialSetupError(Exception):
+    """Errore nella preparazione delle credenziali AWS"""
+
+
+class InteractionRequiredError(CredentialSetupError):
+    """In modalità non interattiva manca un dato che andrebbe chiesto all'utente"""
+
+
+def _is_headless(headless=None):
+    """Risolve il parametro headless di una funzione rispetto al default di modulo"""
+    return HEADLESS if headless is None else headless
+
+
+_init_lock = threading.RLock()
+_ENV_LOADED = False
+_SSO_INITIALIZED = False
+_INQUIRER_MISSING = object()
+_inquirer_module = None
 
 # Funzione di utilità: ricerca file .env risalendo la gerarchia
 def find_env_file():
     """Cerca il file .env partendo dalla directory corrente e risalendo fino alla directory padre"""
-    current_dir = os.getcwd()
-    search_dirs = [
-        current_dir,
-        os.path.dirname(__file__),
-        os.path.dirname(os.path.dirname(__file__)),
-    ]
-    parent_dir = os.path.dirname(current_dir)
-    if parent_dir != current_dir:
-        search_dirs.append(parent_dir)
-
-    for search_dir in search_dirs:
-        env_file = os.path.join(search_dir, '.env')
-        if os.path.exists(env_file):
-            return env_file
-    return None
+    return env_loader.find_env_file()
 
 
-# Carica variabili dal file .env (se presente)
-env_file = find_env_file()
-if env_file:
+def _load_env():
+    """Carica variabili dal file .env (se presente), una sola volta per processo"""
+    global _ENV_LOADED, env_file
+    if _ENV_LOADED:
+        return
+    with _init_lock:
+        if _ENV_LOADED:
+            return
+        env_file = find_env_file()
+        if env_file:
+            print(f"📄 Caricamento configurazione da {env_file}")
+            env_loader.load_env_file(env_file)
+        _ENV_LOADED = True
+
+
+def reload_env():
+    """Riapplica il file .env solo se è cambiato dall'ultimo caricamento (altrimenti costa una stat)"""
+    global env_file
+    with _init_lock:
+        env_file = find_env_file()
+        return env_loader.load_env_file(env_file) if env_file else {}
+
+
+def _bootstrap_sso(headless=None):
+    """Inizializza (una sola volta) AWS SSO Credential Manager e restituisce True se disponibile.
+
+    In modalità non interattiva il setup automatico (che chiede input all'utente) non viene eseguito;
+    se la modalità è richiesta solo per la singola chiamata, una chiamata interattiva successiva
+    potrà ancora tentarlo.
+    """
+    global _SSO_INITIALIZED, _USE_SSO, AWSCredentialManager, aws_sso_path
+    if _SSO_INITIALIZED:
+        return _USE_SSO
+    with _init_lock:
+        if _SSO_INITIALIZED:
+            return _USE_SSO
+        _load_env()
+
+        # Determina il path di aws-sso-credential-manager (variabile d'ambiente o percorsi comuni)
+        aws_sso_path = os.environ.get('AWS_SSO_CREDENTIAL_MANAGER_PATH')
+        if not aws_sso_path:
+            common_paths = [
+                "./aws-sso-credential-manager",
+                "../aws-sso-credential-manager",
+                "~/tools/aws-sso-credential-manager",
+                "/opt/aws-sso-credential-manager",
+                "/usr/local/bin/aws-sso-credential-manager",
+            ]
+            for path in common_paths:
+                expanded_path = os.path.expanduser(path)
+                if os.path.exists(expanded_path):
+                    aws_sso_path = expanded_path
+                    print(f"🔍 AWS SSO Credential Manager trovato in: {aws_sso_path}")
+                    break
+
+            if not aws_sso_path:
+                print("⚠️ AWS SSO Credential Manager non trovato.")
+                print("💡 Imposta AWS_SSO_CREDENTIAL_MANAGER_PATH oppure crea un .env con il path")
+
+        if aws_sso_path and aws_sso_path not in sys.path:
+            sys.path.insert(0, aws_sso_path)
+
+        # Importa direttamente la classe AWSCredentialManager, con fallback di setup automatico
+        try:
+            from credential_manager import AWSCredentialManager
+            _USE_SSO = True
+            print("🎯 AWS SSO Credential Manager disponibile")
+        except ImportError as e:
+            print(f"⚠️ AWS SSO non disponibile: {e}")
+            _USE_SSO = False
+            if _is_headless(headless):
+                # Il setup automatico è interattivo: in modalità non interattiva si prosegue senza SSO
+                _SSO_INITIALIZED = HEADLESS
+                return _USE_SSO
+
+            # Proviamo un setup automatico simile a quello usato in consumer che includono setup_aws_sso
+            try:
+                setup_aws_sso = None
+                # Tentativi multipli di import per essere robusti
+                try:
+                    from . import setup_aws_sso
+                except Exception:
+                    try:
+                        import setup_aws_sso
+                    except Exception:
+                        # Import dinamico dal file presente nella stessa directory di questo modulo
+                        import importlib.util
+                        setup_file = os.path.join(os.path.dirname(__file__), 'setup_aws_sso.py')
+                        if os.path.exists(setup_file):
+                            spec = importlib.util.spec_from_file_location('setup_aws_sso', setup_file)
+                            setup_aws_sso = importlib.util.module_from_spec(spec)
+                            spec.loader.exec_module(setup_aws_sso)
+
+                if setup_aws_sso is None:
+                    raise ImportError('Impossibile importare setup_aws_sso')
+
+                print('🔧 Tentativo di configurazione automatica di aws-sso-credential-manager...')
+                setup_success = False
+                try:
+                    setup_success = setup_aws_sso.run_setup()
+                except Exception:
+                    # run_setup può non esistere o fallire; non blocchiamo l'import
+                    setup_success = False
+
+                if setup_success:
+                    # Ricarica eventuale .env aggiornato (il loader rilegge il file solo se è cambiato)
+                    env_file = find_env_file()
+                    new_aws_sso_path = env_loader.parse_env_file(env_file).get('AWS_SSO_CREDENTIAL_MANAGER_PATH') if env_file else None
+                    if new_aws_sso_path and os.path.exists(new_aws_sso_path):
+                        if aws_sso_path and aws_sso_path in sys.path:
+                            try:
+                                sys.path.remove(aws_sso_path)
+                            except Exception:
+                                pass
+                        if new_aws_sso_path not in sys.path:
+                            sys.path.insert(0, new_aws_sso_path)
+                        aws_sso_path = new_aws_sso_path
+
+                    # Riproviamo l'import
+                    try:
+                        if 'credential_manager' in sys.modules:
+                            del sys.modules['credential_manager']
+                        from credential_manager import AWSCredentialManager
+                        _USE_SSO = True
+                        print('✅ AWS SSO Credential Manager ora disponibile!')
+                    except Exception:
+                        print('❌ Il modulo credential_manager non è ancora disponibile dopo il setup.')
+            except Exception:
+                # Non forziamo un'eccezione all'import del modulo library: semplicemente proseguiamo senza SSO
+                _USE_SSO = False
+
+        _SSO_INITIALIZED = True
+        return _USE_SSO
+
+
+def _get_boto3():
+    """Importa boto3 al primo utilizzo, dopo aver caricato l'eventuale .env"""
+    _load_env()
+    import boto3
+    return boto3
+
+
+# Registro condiviso dei client boto3: un client per (servizio, regione, pool, identità delle credenziali)
+MAX_POOL_CONNECTIONS = int(os.environ.get('MYLIB_MAX_POOL_CONNECTIONS', '10'))
+_CREDENTIAL_ENV_VARS = ('AWS_PROFILE', 'AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN')
+_client_lock = threading.Lock()
+_clients = {}
+
+
+def _credentials_identity():
+    """Identità delle credenziali correnti, così come le vede la catena di default di boto3"""
+    if _refreshable_credentials is not None:
+        return ('mylib-refreshable', id(_refreshable_credentials))
+    return tuple(os.environ.get(name) for name in _CREDENTIAL_ENV_VARS)
+
+
+def get_aws_client(service, region_name=None, max_pool_connections=None):
+    """Restituisce un client boto3 condiviso e thread-safe per il servizio richiesto.
+
+    I client vengono riutilizzati finché non cambiano regione o credenziali in os.environ;
+    max_pool_connections (default MAX_POOL_CONNECTIONS) dimensiona il pool di connessioni HTTP.
+    """
+    _load_env()
+    region_name = region_name or os.environ.get('AWS_DEFAULT_REGION') or os.environ.get('AWS_REGION')
+    pool = max(max_pool_connections or 0, MAX_POOL_CONNECTIONS)
+    identity = _credentials_identity()
+    key = (service, region_name, pool, identity)
+
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _client_lock:
+        client = _clients.get(key)
+        if client is None:
+            boto3 = _get_boto3()
+            from botocore.config import Config
+
+            # I client creati con credenziali diverse da quelle correnti non servono più
+            for stale in [k for k in _clients if k[3] != identity]:
+                del _clients[stale]
+            # Le sessioni boto3 non sono thread-safe: ne usiamo una dedicata, creata sotto lock
+            if _refreshable_credentials is not None:
+                session = boto3.session.Session(botocore_session=_refreshable_botocore_session(), region_name=region_name)
+            else:
+                session = boto3.session.Session(region_name=region_name)
+            client = session.client(service, config=Config(max_pool_connections=pool))
+            if _instrumentation_enabled:
+                _instrument_client(client)
+            _clients[key] = client
+    return client
+
+
+def invalidate_aws_clients():
+    """Svuota il registro dei client (es. dopo l'installazione di nuove credenziali)"""
+    with _client_lock:
+        _clients.clear()
+
+
+# Strumentazione delle chiamate AWS: handler sugli eventi botocore dei client della libreria, registrati solo
+# mentre è attiva (a strumentazione disattivata il costo per chiamata è nullo)
+_PAGINATED_OPERATIONS = {'ListObjects', 'ListObjectsV2', 'ListObjectVersions', 'Scan', 'Query'}
+_instrumentation_enabled = False
+_instrumentation_callbacks = []
+_instrumentation_lock = threading.Lock()
+_instrumentation_metrics = {}
+
+
+def _body_size(body):
+    """Dimensione in byte del body di una richiesta (bytes, stringa o file-like posizionabile)"""
+    if body is None or isinstance(body, dict):
+        return 0
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
     try:
-        print(f"📄 Caricamento configurazione da {env_file}")
-        with open(env_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key.strip()] = value.strip()
+        position = body.tell()
+        size = body.seek(0, os.SEEK_END) - position
+        body.seek(position)
+        return size
     except Exception:
-        # Non bloccare l'import se il .env è malformato
-        pass
+        return 0
+
+
+def _consumed_capacity_units(parsed):
+    """Capacità consumata (somma di CapacityUnits) riportata da una risposta DynamoDB"""
+    consumed = parsed.get('ConsumedCapacity') if isinstance(parsed, dict) else None
+    if not consumed:
+        return 0.0
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    return float(sum(entry.get('CapacityUnits', 0) for entry in consumed))
+
+
+def _on_before_parameter_build(params, model, **kwargs):
+    # Chiede a DynamoDB la capacità consumata per ogni operazione che la supporta
+    if 'ReturnConsumedCapacity' in model.input_shape.members:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+def _on_before_call(model, params, context, **kwargs):
+    context['mylib_call'] = (model.service_model.service_name, model.name)
+    context['mylib_bytes_sent'] = _body_size(params.get('body'))
+    context['mylib_started'] = time.perf_counter()
+
+
+def _on_after_call(http_response, parsed, model, context, **kwargs):
+    # before-call non viene eseguito se un altro handler fornisce già la risposta (es. Stubber)
+    context.setdefault('mylib_call', (model.service_model.service_name, model.name))
+    metadata = parsed.get('ResponseMetadata', {}) if isinstance(parsed, dict) else {}
+    error = parsed.get('Error', {}).get('Code') if http_response.status_code >= 300 and isinstance(parsed, dict) else None
+    _record_call(context, {
+        'status': http_response.status_code,
+        'retries': metadata.get('RetryAttempts', 0),
+        'bytes_received': int(http_response.headers.get('content-length') or 0),
+        'consumed_capacity': _consumed_capacity_units(parsed),
+        'error': error,
+    })
+
+
+def _on_after_call_error(exception, context, **kwargs):
+    _record_call(context, {
+        'status': None,
+        'retries': 0,
+        'bytes_received': 0,
+        'consumed_capacity': 0.0,
+        'error': type(exception).__name__,
+    })
+
+
+def _record_call(context, event):
+    if 'mylib_call' not in context:
+        return  # client strumentato mentre la chiamata era già in corso
+    event['service'], event['operation'] = context['mylib_call']
+    started = context.get('mylib_started')
+    event['seconds'] = time.perf_counter() - started if started is not None else 0.0
+    event['bytes_sent'] = context.get('mylib_bytes_sent', 0)
+    event['pages'] = 1 if event['operation'] in _PAGINATED_OPERATIONS and event['error'] is None else 0
+
+    key = (event['service'], event['operation'])
+    with _instrumentation_lock:
+        metrics = _instrumentation_metrics.get(key)
+        if metrics is None:
+            metrics = _instrumentation_metrics[key] = dict.fromkeys(
+                ('calls', 'errors', 'seconds', 'retries', 'pages', 'bytes_sent', 'bytes_received', 'consumed_capacity'), 0)
+        metrics['calls'] += 1
+        metrics['errors'] += event['error'] is not None
+        for name in ('seconds', 'retries', 'pages', 'bytes_sent', 'bytes_received', 'consumed_capacity'):
+            metrics[name] += event[name]
+        callbacks = list(_instrumentation_callbacks)
+    for callback in callbacks:
+        try:
+            callback(event)
+        except Exception as e:
+            # Una callback difettosa non deve mai far fallire la chiamata AWS
+            print(f"⚠️ Callback di strumentazione fallita: {e}")
 
-# Determina il path di aws-sso-credential-manager (variabile d'ambiente o percorsi comuni)
-aws_sso_path = os.environ.get('AWS_SSO_CREDENTIAL_MANAGER_PATH')
-if not aws_sso_path:
-    common_paths = [
-        "./aws-sso-credential-manager",
-        "../aws-sso-credential-manager",
-        "~/tools/aws-sso-credential-manager",
-        "/opt/aws-sso-credential-manager",
-        "/usr/local/bin/aws-sso-credential-manager",
-    ]
-    for path in common_paths:
-        expanded_path = os.path.expanduser(path)
-        if os.path.exists(expanded_path):
-            aws_sso_path = expanded_path
-            print(f"🔍 AWS SSO Credential Manager trovato in: {aws_sso_path}")
-            break
-
-    if not aws_sso_path:
-        print("⚠️ AWS SSO Credential Manager non trovato.")
-        print("💡 Imposta AWS_SSO_CREDENTIAL_MANAGER_PATH oppure crea un .env con il path")
-
-if aws_sso_path and aws_sso_path not in sys.path:
-    sys.path.insert(0, aws_sso_path)
-
-
-# Importa direttamente la classe AWSCredentialManager, con fallback di setup automatico
-try:
-    from credential_manager import AWSCredentialManager
-    _USE_SSO = True
-    print("🎯 AWS SSO Credential Manager disponibile")
-except ImportError as e:
-    print(f"⚠️ AWS SSO non disponibile: {e}")
-    _USE_SSO = False
-
-    # Proviamo un setup automatico simile a quello usato in consumer che includono setup_aws_sso
-    try:
-        setup_aws_sso = None
-        # Tentativi multipli di import per essere robusti
+
+_INSTRUMENTATION_HANDLERS = (
+    ('before-parameter-build.dynamodb', _on_before_parameter_build),
+    ('before-call', _on_before_call),
+    ('after-call', _on_after_call),
+    ('after-call-error', _on_after_call_error),
+)
+
+
+def _instrument_client(client, enable=True):
+    """Registra (o rimuove) gli handler di strumentazione sugli eventi di un client botocore"""
+    for event_name, handler in _INSTRUMENTATION_HANDLERS:
+        unique_id = f"mylib-{handler.__name__}"
+        if enable:
+            client.meta.events.register(event_name, handler, unique_id=unique_id)
+        else:
+            client.meta.events.unregister(event_name, handler, unique_id=unique_id)
+
+
+def enable_instrumentation(callback=None):
+    """Attiva la strumentazione di tutte le chiamate S3/DynamoDB fatte con i client della libreria.
+
+    Per ogni chiamata AWS (una per pagina nei listing/scan) vengono misurati durata, byte inviati e
+    ricevuti, retry di botocore, pagine e capacità DynamoDB consumata. Gli eventi (dizionari con chiavi
+    service, operation, seconds, status, retries, pages, bytes_sent, bytes_received, consumed_capacity,
+    error) vengono passati alle callback registrate e aggregati per dump_instrumentation_metrics().
+    """
+    global _instrumentation_enabled
+    if callback is not None:
+        add_instrumentation_callback(callback)
+    with _client_lock:
+        if not _instrumentation_enabled:
+            for client in _clients.values():
+                _instrument_client(client)
+            _instrumentation_enabled = True
+
+
+def disable_instrumentation():
+    """Disattiva la strumentazione (callback e metriche aggregate restano disponibili)"""
+    global _instrumentation_enabled
+    with _client_lock:
+        if _instrumentation_enabled:
+            for client in _clients.values():
+                _instrument_client(client, enable=False)
+            _instrumentation_enabled = False
+
+
+def add_instrumentation_callback(callback):
+    """Registra una callback chiamata con l'evento di ogni chiamata AWS strumentata"""
+    with _instrumentation_lock:
+        if callback not in _instrumentation_callbacks:
+            _instrumentation_callbacks.append(callback)
+
+
+def remove_instrumentation_callback(callback):
+    with _instrumentation_lock:
+        if callback in _instrumentation_callbacks:
+            _instrumentation_callbacks.remove(callback)
+
+
+def get_instrumentation_metrics():
+    """Metriche aggregate per (servizio, operazione): calls, errors, seconds, retries, pages, bytes, capacità"""
+    with _instrumentation_lock:
+        return {key: dict(metrics) for key, metrics in _instrumentation_metrics.items()}
+
+
+def reset_instrumentation_metrics():
+    with _instrumentation_lock:
+        _instrumentation_metrics.clear()
+
+
+_PROMETHEUS_METRICS = (
+    ('calls', 'mylib_aws_calls_total', 'Chiamate AWS eseguite'),
+    ('errors', 'mylib_aws_errors_total', 'Chiamate AWS fallite'),
+    ('seconds', 'mylib_aws_call_seconds_total', 'Durata complessiva delle chiamate AWS in secondi'),
+    ('retries', 'mylib_aws_retries_total', 'Retry eseguiti da botocore'),
+    ('pages', 'mylib_aws_pages_total', 'Pagine lette da listing S3 e scan/query DynamoDB'),
+    ('bytes_sent', 'mylib_aws_bytes_sent_total', 'Byte inviati nei body delle richieste'),
+    ('bytes_received', 'mylib_aws_bytes_received_total', 'Byte ricevuti nei body delle risposte'),
+    ('consumed_capacity', 'mylib_dynamodb_consumed_capacity_units_total', 'Capacity unit DynamoDB consumate'),
+)
+
+
+def dump_instrumentation_metrics(format="json", stream=None):
+    """Esporta le metriche aggregate in JSON o nel formato testuale di Prometheus ("prometheus").
+
+    Restituisce il testo prodotto e, se indicato, lo scrive anche su stream.
+    """
+    metrics = get_instrumentation_metrics()
+    if format == "json":
+        text = json.dumps([{'service': service, 'operation': operation, **values}
+                           for (service, operation), values in sorted(metrics.items())], indent=2)
+    elif format == "prometheus":
+        lines = []
+        for field, name, description in _PROMETHEUS_METRICS:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            for (service, operation), values in sorted(metrics.items()):
+                lines.append(f'{name}{{service="{service}",operation="{operation}"}} {values[field]}')
+        text = "\n".join(lines) + "\n"
+    else:
+        raise ValueError(f"Formato non supportato: {format} (usare 'json' o 'prometheus')")
+    if stream is not None:
+        stream.write(text)
+    return text
+
+
+# Codici di errore AWS considerati transitori (throttling, timeout, errori lato servizio)
+_TRANSIENT_ERROR_CODES = {
+    'RequestTimeout', 'RequestTimeoutException', 'SlowDown', 'Throttling', 'ThrottlingException',
+    'ProvisionedThroughputExceededException', 'RequestLimitExceeded', 'InternalError',
+    'InternalServerError', 'ServiceUnavailable',
+}
+
+
+def _is_transient_error(error):
+    """True se l'errore è transitorio e l'operazione può essere ritentata"""
+    from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+
+    if isinstance(error, (BotoConnectionError, HTTPClientError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+        return code in _TRANSIENT_ERROR_CODES or status >= 500
+    return False
+
+
+def _call_with_retries(func, retries=3, backoff=0.5):
+    """Esegue func ritentando gli errori transitori con backoff esponenziale (con jitter).
+
+    Restituisce (risultato, tentativi); in caso di fallimento l'eccezione originale viene rilanciata
+    con l'attributo `mylib_attempts`.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
         try:
-            from . import setup_aws_sso
-        except Exception:
-            try:
-                import setup_aws_sso
-            except Exception:
-                # Import dinamico dal file presente nella stessa directory di questo modulo
-                import importlib.util
-                setup_file = os.path.join(os.path.dirname(__file__), 'setup_aws_sso.py')
-                if os.path.exists(setup_file):
-                    spec = importlib.util.spec_from_file_location('setup_aws_sso', setup_file)
-                    setup_aws_sso = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(setup_aws_sso)
-
-        if setup_aws_sso is None:
-            raise ImportError('Impossibile importare setup_aws_sso')
-
-        print('🔧 Tentativo di configurazione automatica di aws-sso-credential-manager...')
-        setup_success = False
+            return func(), attempt
+        except Exception as e:
+            if attempt > retries or not _is_transient_error(e):
+                e.mylib_attempts = attempt
+                raise
+            time.sleep(random.uniform(0, backoff * (2 ** (attempt - 1))))
+
+
+def _get_inquirer():
+    """Import pigro di inquirer per menu interattivi (frecce); None se non disponibile"""
+    global _inquirer_module
+    if _inquirer_module is None:
         try:
-            setup_success = setup_aws_sso.run_setup()
+            import inquirer
+            _inquirer_module = inquirer
         except Exception:
-            # run_setup può non esistere o fallire; non blocchiamo l'import
-            setup_success = False
-
-        if setup_success:
-            # Ricarica eventuale .env aggiornato
-            env_file = find_env_file()
-            if env_file:
-                with open(env_file, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#') and '=' in line:
-                            key, value = line.split('=', 1)
-                            if key.strip() == 'AWS_SSO_CREDENTIAL_MANAGER_PATH':
-                                new_aws_sso_path = value.strip()
-                                if os.path.exists(new_aws_sso_path):
-                                    if aws_sso_path and aws_sso_path in sys.path:
-                                        try:
-                                            sys.path.remove(aws_sso_path)
-                                        except Exception:
-                                            pass
-                                    if new_aws_sso_path not in sys.path:
-                                        sys.path.insert(0, new_aws_sso_path)
-                                    aws_sso_path = new_aws_sso_path
-
-            # Riproviamo l'import
-            try:
-                if 'credential_manager' in sys.modules:
-                    del sys.modules['credential_manager']
-                from credential_manager import AWSCredentialManager
-                _USE_SSO = True
-                print('✅ AWS SSO Credential Manager ora disponibile!')
-            except Exception:
-                print('❌ Il modulo credential_manager non è ancora disponibile dopo il setup.')
-    except Exception:
-        # Non forziamo un'eccezione all'import del modulo library: semplicemente proseguiamo senza SSO
-        _USE_SSO = False
+            _inquirer_module = _INQUIRER_MISSING
+    return None if _inquirer_module is _INQUIRER_MISSING else _inquirer_module
+
+
+def __getattr__(name):
+    """Risolve al primo accesso gli attributi di modulo che in modalità lazy non sono ancora inizializzati"""
+    if name in ('_USE_SSO', 'AWSCredentialManager', 'aws_sso_path'):
+        _bootstrap_sso()
+    elif name == 'env_file':
+        _load_env()
+    elif name == 'INQUIRER_AVAILABLE':
+        return _get_inquirer() is not None
+    elif name == 'boto3':
+        return _get_boto3()
+    if name in globals():
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Senza modalità lazy si mantiene il comportamento storico: auto-configurazione al primo import
+if not LAZY_INIT:
+    _bootstrap_sso()
 
 def is_wsl(v: str = platform.uname().release) -> int:
     """
@@ -196,21 +579,36 @@ def saveCredentials(user, passwd, name=None):
     os.environ['username'] = user
     os.environ['password'] = passwd
 
-# Ciclo attraverso tutti i file nella directory corrente ed elimina quelli più vecchi di un certo numero di secondi
-def listAndDeleteFiles(file_pattern, secs, current_time):
-    for filename in os.listdir():
-        match = re.match(file_pattern, filename)
-        if match:
-            file_time = match.group(1)  # Estrai la data/ora dal nome del file
-            file_datetime = datetime.strptime(file_time, "%Y%m%d%H%M")
-            # Confronta la data/ora attuale con la data/ora del file + 1 ora
-            if (file_datetime + timedelta(seconds=secs)) < current_time:
-                os.remove(filename)
-                print(f"\nFile '{filename}' rimosso.\n")
+# Ciclo attraverso tutti i file della directory (default quella corrente) ed elimina quelli più vecchi di un certo numero di secondi
+def listAndDeleteFiles(file_pattern, secs, current_time, directory="."):
+    pattern = _compile_pattern(file_pattern)
+    with os.scandir(directory) as it:
+        for entry in it:
+            match = pattern.match(entry.name)
+            if match:
+                file_time = match.group(1)  # Estrai la data/ora dal nome del file
+                file_datetime = datetime.strptime(file_time, "%Y%m%d%H%M")
+                # Confronta la data/ora attuale con la data/ora del file + 1 ora
+                if (file_datetime + timedelta(seconds=secs)) < current_time:
+                    os.remove(entry.path)
+                    print(f"\nFile '{entry.name}' rimosso.\n")
+
+@functools.lru_cache(maxsize=64)
+def _compile_pattern(pattern):
+    """Compila una sola volta i pattern dei nomi file usati a ogni esecuzione"""
+    return re.compile(pattern)
 
 # Seleziona il path della home directory dove solitamente risiede la folder .aws che ospita le credenziali temporanee
-def createHomeDirPath(name):
+def createHomeDirPath(name, home_dir=None, headless=None):
+    home_dir = home_dir or os.environ.get('MYLIB_HOME_DIR')
+    if home_dir:
+        return home_dir
     if not os.path.exists(name):
+        if _is_headless(headless):
+            raise InteractionRequiredError(f"Home directory non configurata: impostare MYLIB_HOME_DIR o creare {name}")
+        import tkinter as tk
+        from tkinter import filedialog
+
         # Crea una finestra principale nascosta
         root = tk.Tk()
         root.withdraw()
@@ -228,21 +626,30 @@ def createHomeDirPath(name):
     return homeDir
 
 # Trova tutti i file nella directory corrente che iniziano con il prefisso del ruolo di default
-def enumerateCredentialFiles(defaultRole):
+# Con uno CredentialStore i file vengono presi dal suo manifest (solo quelli non scaduti, dal più recente)
+def enumerateCredentialFiles(defaultRole, headless=None, store=None):
     selected_file = None
     aws_access_key_id = None
     aws_secret_access_key = None
     aws_session_token = None
     aws_security_token = None
-    file_list = [file for file in os.listdir() if file.startswith(defaultRole)]
+    if store is not None:
+        file_list = [entry['path'] for entry in store.entries(defaultRole)]
+    else:
+        with os.scandir() as it:
+            file_list = [entry.name for entry in it if entry.name.startswith(defaultRole)]
     if file_list :
-        # Stampa l'elenco numerato dei file
-        print("\nElenco dei file disponibili:\n")
-        for index, file_name in enumerate(file_list, start=1):
-            print(f"{index}. {file_name}")
+        if _is_headless(headless):
+            # Senza prompt si usa il file più recente (il timestamp è nel nome, YYYYMMDDHHMM)
+            choice = str(file_list.index(max(file_list, key=lambda f: f.rpartition('_')[2])) + 1)
+        else:
+            # Stampa l'elenco numerato dei file
+            print("\nElenco dei file disponibili:\n")
+            for index, file_name in enumerate(file_list, start=1):
+                print(f"{index}. {os.path.basename(file_name)}")
 
-        # Chiedi all'utente di selezionare un numero
-        choice = input("\nSeleziona un numero (0 per uscire): ")
+            # Chiedi all'utente di selezionare un numero
+            choice = input("\nSeleziona un numero (0 per uscire): ")
 
         # Verifica la scelta dell'utente
         if choice.isdigit():
@@ -251,6 +658,7 @@ def enumerateCredentialFiles(defaultRole):
                 selected_file = file_list[choice - 1]
 
                 # Crea un oggetto ConfigParser
+                import configparser
                 projRoleCred = configparser.ConfigParser()
 
                 # Leggi il file di configurazione
@@ -263,7 +671,7 @@ def enumerateCredentialFiles(defaultRole):
                 aws_security_token = projRoleCred['default']['aws_security_token']
 
                 # Dividi il nome del file utilizzando l'underscore come separatore
-                parts = selected_file.split('_')
+                parts = os.path.basename(selected_file).split('_')
 
                 # Verifica se ci sono almeno due parti (prima e dopo l'underscore)
                 if len(parts) >= 2:
@@ -297,8 +705,20 @@ def enumerateCredentialFiles(defaultRole):
             print("\nInput non valido. Si procederà con nuove credenziali temporanee.\n")
             return None
         
-def envSaveTempCredentials(config, awsauth=None, roleName=None):
+def envSaveTempCredentials(config, awsauth=None, roleName=None, headless=None, home_dir=None, profile=None,
+                           credential_store=None):
+    """
+    Prepara le credenziali temporanee AWS e le esporta nelle variabili d'ambiente.
+
+    Con headless=True (o MYLIB_HEADLESS=1) l'intero processo è non interattivo: home directory, ruolo e
+    profilo SSO arrivano dai parametri o da MYLIB_HOME_DIR / MYLIB_ROLE / MYLIB_PROFILE, non ci sono
+    prompt né attese e gli errori sono sollevati come CredentialSetupError.
+
+    I file di credenziali dei progetti vengono letti e salvati in credential_store (default: uno
+    CredentialStore sotto la home directory, con scadenza timeToDelete) invece che nella directory corrente.
+    """
     rows = []
+    roleName = roleName or os.environ.get('MYLIB_ROLE')
 
     basicRolePrefix = config["configuration"]["generic"]["role"]["value"]
     homeDirFileName = config["configuration"]["generic"]["homeDirFileName"]["value"]
@@ -313,28 +733,30 @@ def envSaveTempCredentials(config, awsauth=None, roleName=None):
     else:
         saveCredentials(user, passwd)
 
-    homeDir = createHomeDirPath(homeDirFileName)
+    homeDir = createHomeDirPath(homeDirFileName, home_dir, headless)
 
-    file_pattern = r"^"+basicRolePrefix+r".*_(\d{12})\..*$"
-    print(f"\nPattern per la ricerca dei file: {file_pattern}\n")
     secs = float(config["configuration"]["timeToDelete"]["seconds"])
-    current_time = datetime.now()
-
-    listAndDeleteFiles(file_pattern, secs, current_time)
+    store = credential_store or CredentialStore(home_dir=homeDir, ttl=secs)
+    print(f"\nDirectory dei file di credenziali: {store.directory}\n")
+    for removed in store.cleanup():
+        print(f"\nFile '{os.path.basename(removed)}' rimosso.\n")
 
     # Stampa il percorso selezionato
     print("Percorso selezionato della home directory:", homeDir)
     if roleName is None:
-        result = enumerateCredentialFiles(defaultRole)
+        result = enumerateCredentialFiles(defaultRole, headless, store)
     else:
-        result = enumerateCredentialFiles(roleName)
+        result = enumerateCredentialFiles(roleName, headless, store)
 
     if result == None:
         print(f"Si procederà al prelievo delle credenziali temporanee modificando le variabili dell'ambiente scelto...\n")
-        tempCredentials, role_arn = getTempCredentials(homeDir, config)
+        # In modalità interattiva l'utente ha scelto di non usare le credenziali esistenti: niente cache,
+        # il menu SSO deve permettergli di cambiare profilo
+        tempCredentials, role_arn = getTempCredentials(homeDir, config, profile, use_cache=_is_headless(headless),
+                                                       headless=headless)
         
         # Per SSO, crea direttamente il selectedFile e salta saveTempCredentials
-        if _USE_SSO:
+        if _bootstrap_sso(headless):
             import time
             current_time = time.strftime("%Y%m%d%H%M")
             
@@ -359,7 +781,7 @@ def envSaveTempCredentials(config, awsauth=None, roleName=None):
             session_token = aws_config['default']['aws_session_token']
             security_token = aws_config['default']['aws_security_token']
         else:
-            selectedFile = saveTempCredentials(tempCredentials, role_arn, rows)
+            selectedFile = saveTempCredentials(tempCredentials, role_arn, rows, store)
 
             # Check if 'rows' has enough elements
             if len(rows) < 5:
@@ -373,7 +795,7 @@ def envSaveTempCredentials(config, awsauth=None, roleName=None):
         try:
             selectedFile, access_key, secret_key, session_token, security_token = result
             print(f"File selezionato: {selectedFile}.\nAcquisisco le credenziali temporanee...")
-            role_arn = getRoleArn(homeDir, config)
+            role_arn = getRoleArn(homeDir, config, headless)
         except ValueError:
             print("Errore: Il risultato non contiene tutti i valori necessari.")
             raise
@@ -391,6 +813,7 @@ def envSaveTempCredentials(config, awsauth=None, roleName=None):
     os.environ['AWS_SESSION_TOKEN'] = session_token
     os.environ['AWS_SECURITY_TOKEN'] = security_token
     os.environ['AWS_DEFAULT_REGION'] = 'eu-central-1'  # Region di default per ENEL
+    invalidate_aws_clients()
     print(envprefix)
     return envprefix
 
@@ -403,32 +826,203 @@ def filterFileList(objects, filter):
     filtered_objects = [obj for obj in objects.get('Contents', []) if filter in obj['Key']]
     return filtered_objects
 
-def getFileListSortedByDate(bucket, folderKey, subFolderKey, filter, num_days):
+def iterS3Objects(bucket, prefix, filter="", since=None, s3=None, page_size=None):
+    """Generatore sugli oggetti S3 sotto `prefix`, pagina per pagina (paginator di list_objects_v2).
+
+    Il filtro per sottostringa (come filterFileList) e il limite su LastModified (`since`, datetime UTC)
+    vengono applicati su ogni pagina, senza mai materializzare l'intero elenco.
+    """
+    if s3 is None:
+        s3 = get_aws_client('s3')
+    pagination = {'PageSize': page_size} if page_size else {}
+
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, PaginationConfig=pagination):
+        for obj in filterFileList(page, filter or ""):
+            if _isRecentObject(obj, since):
+                yield obj
+
+def _isRecentObject(obj, since):
+    return since is None or obj['LastModified'].replace(tzinfo=timezone.utc) >= since
+
+def _newestObjects(objects, max_files=None):
+    """Ordina gli oggetti dal più recente; con max_files mantiene solo i primi N tramite heap limitato"""
+    if max_files is None:
+        return sorted(objects, key=lambda x: x['LastModified'], reverse=True)
+    return heapq.nlargest(max_files, objects, key=lambda x: x['LastModified'])
+
+def _discoverS3Shards(s3, bucket, prefix, filter="", since=None, shard_alphabet=None):
+    """Individua i sotto-prefissi su cui suddividere il listing di `prefix`.
+
+    Con `shard_alphabet` gli shard sono prefix + carattere (l'alfabeto deve coprire tutti i caratteri
+    che possono seguire il prefisso). Altrimenti vengono scoperti con Delimiter='/', scendendo di livello
+    finché si trova un solo sotto-prefisso. Restituisce (shards, oggetti diretti già filtrati).
+    """
+    if shard_alphabet:
+        return [prefix + c for c in shard_alphabet], []
+
+    shards, direct = [prefix], []
+    paginator = s3.get_paginator('list_objects_v2')
+    while len(shards) == 1:
+        level = shards[0]
+        shards = []
+        for page in paginator.paginate(Bucket=bucket, Prefix=level, Delimiter='/'):
+            shards.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+            direct.extend(obj for obj in filterFileList(page, filter or "") if _isRecentObject(obj, since))
+    return shards, direct
+
+def listS3ObjectsSharded(bucket, prefix, filter="", since=None, max_files=None, max_workers=8, shard_alphabet=None, s3=None):
+    """Lista `prefix` suddividendolo in sotto-prefissi elaborati in parallelo su un pool di thread.
+
+    Restituisce la stessa lista di oggetti (dal più recente, eventualmente limitata a max_files)
+    prodotta dal listing seriale.
+    """
+    if s3 is None:
+        s3 = get_aws_client('s3')
+
+    shards, direct = _discoverS3Shards(s3, bucket, prefix, filter, since, shard_alphabet)
+
+    def _listShard(shard):
+        return _newestObjects(iterS3Objects(bucket, shard, filter, since, s3=s3), max_files)
+
+    results = [_newestObjects(direct, max_files)]
+    if shards:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(shards)))) as executor:
+            results.extend(executor.map(_listShard, shards))
+    return _newestObjects(itertools.chain.from_iterable(results), max_files)
+
+class S3ListingCache:
+    """Cache su disco (SQLite) dei listing S3, per bucket/prefisso.
+
+    Entro `ttl` secondi il listing viene servito dalla cache senza chiamate AWS. Scaduto il TTL,
+    con append_only=True vengono richiesti solo gli oggetti successivi all'ultima chiave vista
+    (StartAfter); altrimenti il prefisso viene rilistato e la cache aggiornata confrontando
+    ETag/LastModified, eliminando le chiavi sparite.
+    """
+
+    def __init__(self, home_dir=None, ttl=300, append_only=False, path=None):
+        """Inizializza la cache
+
+        Args:
+            home_dir: Home directory (es. quella scelta con createHomeDirPath); default la home dell'utente
+            ttl: Secondi per cui un listing è considerato valido
+            append_only: True se nel prefisso gli oggetti vengono solo aggiunti (refresh incrementale)
+            path: Path esplicito del file SQLite (opzionale)
+        """
+        if path is None:
+            path = os.path.join(home_dir or os.path.expanduser('~'), '.mylib', 's3_listing_cache.sqlite')
+        self.path = path
+        self.ttl = ttl
+        self.append_only = append_only
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS listings (
+                    bucket TEXT, prefix TEXT, last_key TEXT, refreshed_at REAL, generation INTEGER,
+                    PRIMARY KEY (bucket, prefix));
+                CREATE TABLE IF NOT EXISTS objects (
+                    bucket TEXT, prefix TEXT, key TEXT, size INTEGER, last_modified TEXT, etag TEXT,
+                    storage_class TEXT, generation INTEGER,
+                    PRIMARY KEY (bucket, prefix, key));
+            """)
+
+    def _connect(self):
+        # Da usare come `with closing(self._connect()) as conn, conn:` (il solo `with conn` gestisce la
+        # transazione ma non chiude la connessione)
+        import sqlite3
+        return sqlite3.connect(self.path, timeout=30)
+
+    def list_objects(self, bucket, prefix, s3=None):
+        """Restituisce gli oggetti sotto prefix (stessa forma di list_objects_v2), aggiornando la cache se serve"""
+        with self._lock, closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT last_key, refreshed_at, generation FROM listings WHERE bucket = ? AND prefix = ?",
+                               (bucket, prefix)).fetchone()
+            if row is None or time.time() - row[1] >= self.ttl:
+                self._refresh(conn, bucket, prefix, row, s3 or get_aws_client('s3'))
+            rows = conn.execute("SELECT key, size, last_modified, etag, storage_class FROM objects "
+                                "WHERE bucket = ? AND prefix = ? ORDER BY key", (bucket, prefix)).fetchall()
+        return [{'Key': key, 'Size': size, 'LastModified': datetime.fromisoformat(last_modified),
+                 'ETag': etag, 'StorageClass': storage_class}
+                for key, size, last_modified, etag, storage_class in rows]
+
+    def _refresh(self, conn, bucket, prefix, row, s3):
+        incremental = row is not None and self.append_only and row[0] is not None
+        generation = (row[2] if row is not None else 0) + (0 if incremental else 1)
+        params = {'Bucket': bucket, 'Prefix': prefix}
+        if incremental:
+            params['StartAfter'] = row[0]
+        last_key = row[0] if incremental else None
+
+        # Versione in cache di ogni chiave, per riscrivere solo le righe nuove o con ETag/LastModified cambiati
+        cached = {} if incremental else {
+            key: (etag, last_modified) for key, etag, last_modified in conn.execute(
+                "SELECT key, etag, last_modified FROM objects WHERE bucket = ? AND prefix = ?", (bucket, prefix))}
+        seen = set()
+
+        paginator = s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(**params):
+            contents = page.get('Contents', [])
+            if not contents:
+                continue
+            changed = []
+            for obj in contents:
+                last_modified = obj['LastModified'].isoformat()
+                seen.add(obj['Key'])
+                if cached.get(obj['Key']) != (obj.get('ETag'), last_modified):
+                    changed.append((bucket, prefix, obj['Key'], obj.get('Size', 0), last_modified,
+                                    obj.get('ETag'), obj.get('StorageClass'), generation))
+            if changed:
+                conn.executemany(
+                    "INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (bucket, prefix, key) DO UPDATE SET generation = excluded.generation, "
+                    "size = excluded.size, last_modified = excluded.last_modified, etag = excluded.etag, "
+                    "storage_class = excluded.storage_class", changed)
+            last_key = contents[-1]['Key']
+
+        if not incremental:
+            # Le chiavi non più presenti nel listing vengono eliminate
+            conn.executemany("DELETE FROM objects WHERE bucket = ? AND prefix = ? AND key = ?",
+                             [(bucket, prefix, key) for key in cached.keys() - seen])
+        conn.execute("INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?)",
+                     (bucket, prefix, last_key, time.time(), generation))
+
+    def invalidate(self, bucket=None, prefix=None):
+        """Elimina dalla cache i listing (tutti, di un bucket o di un singolo prefisso)"""
+        where, args = "", ()
+        if bucket is not None:
+            where, args = " WHERE bucket = ?", (bucket,)
+            if prefix is not None:
+                where, args = " WHERE bucket = ? AND prefix = ?", (bucket, prefix)
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM listings" + where, args)
+            conn.execute("DELETE FROM objects" + where, args)
+
+def _iterCachedS3Objects(cache, bucket, prefix, filter="", since=None, s3=None):
+    """Come iterS3Objects, ma servito da una S3ListingCache"""
+    for obj in cache.list_objects(bucket, prefix, s3):
+        if (filter or "") in obj['Key'] and _isRecentObject(obj, since):
+            yield obj
+
+def getFileListSortedByDate(bucket, folderKey, subFolderKey, filter, num_days, max_files=None, max_workers=None, shard_alphabet=None, cache=None):
     if subFolderKey is not None:
         folderKey = f"{folderKey}/{subFolderKey}"
-    
-    # Crea un client S3
-    s3 = boto3.client('s3')
+
+    # Client S3 condiviso, con un pool di connessioni adeguato al listing parallelo
+    s3 = get_aws_client('s3', max_pool_connections=max_workers)
 
     # Specifica il filtro (esempio: file che contengono 'fjb' o cartelle che contengono 'CP')
-    #filter = str(input('\ninserisci il filtro desiderato: '))  # Sostituisci con il filtro desiderato
+    if filter is None:
+        filter = input('\ninserisci il filtro desiderato: ')  # Sostituisci con il filtro desiderato
     Key=f"{folderKey}"
 
     print(f"{bucket}/{Key}")
-    
-    objects = s3.list_objects_v2(Bucket=bucket, Prefix=Key)
-    filtered_objects = filterFileList(objects, filter)
-
-#    print(objects)
-#    filtered_objects = filterFileList(objects, Key)
-#    filtered_objects = [obj for obj in objects.get('Contents', [])]
-#    print(filtered_objects)
 
     # Chiedi all'utente il numero di giorni da considerare
     if num_days is None:    
         num_days = input("\nInserisci il numero di giorni precedenti ad oggi per cui visualizzare i file: ")
 
-    if num_days.strip() == "":
+    if str(num_days).strip() == "":
         num_days = "10"
         print(f"\nVerranno visualizzati i file recenti risalenti agli ultimi {num_days} giorni...")
 
@@ -437,10 +1031,13 @@ def getFileListSortedByDate(bucket, folderKey, subFolderKey, filter, num_days):
     # Calcola la data di num_days fa
     num_days_ago = datetime.now(timezone.utc) - timedelta(days=num_days)
 
-    # Filtra e ordina gli oggetti in base alla data
-    recent_objects = [obj for obj in filtered_objects if obj['LastModified'].replace(tzinfo=timezone.utc) >= num_days_ago]
-        
-    recent_objects.sort(key=lambda x: x['LastModified'], reverse=True)
+    # Filtra (dalla cache, pagina per pagina o per shard in parallelo) e ordina gli oggetti in base alla data
+    if cache is not None:
+        recent_objects = _newestObjects(_iterCachedS3Objects(cache, bucket, Key, filter, num_days_ago, s3=s3), max_files)
+    elif max_workers or shard_alphabet:
+        recent_objects = listS3ObjectsSharded(bucket, Key, filter, num_days_ago, max_files, max_workers or 8, shard_alphabet, s3=s3)
+    else:
+        recent_objects = _newestObjects(iterS3Objects(bucket, Key, filter, num_days_ago, s3=s3), max_files)
 
     # Inizializza la variabile i a 0
     i = 0
@@ -452,44 +1049,38 @@ def getFileListSortedByDate(bucket, folderKey, subFolderKey, filter, num_days):
         print(f"\n{i}. Nome: {obj['Key']}  Data di modifica: {obj['LastModified']}\n")
     return recent_objects, num_days, i
 
-def getFileListSortedByCount(bucket, folderKey, subFolderKey, filter, num_files):
+def getFileListSortedByCount(bucket, folderKey, subFolderKey, filter, num_files, max_workers=None, shard_alphabet=None, cache=None):
     if subFolderKey is not None:
         folderKey = f"{folderKey}/{subFolderKey}"
     #print(subFolderKey)
 
-    # Crea un client S3
-    s3 = boto3.client('s3')
+    # Client S3 condiviso, con un pool di connessioni adeguato al listing parallelo
+    s3 = get_aws_client('s3', max_pool_connections=max_workers)
 
-    #filtered_objects = filterFileList(objects)
     # Specifica il filtro (esempio: file che contengono 'fjb' o cartelle che contengono 'CP')
-    #filter = input('\ninserisci il filtro desiderato: ')  # Sostituisci con il filtro desiderato
+    if filter is None:
+        filter = input('\ninserisci il filtro desiderato: ')  # Sostituisci con il filtro desiderato
     Key=f"{folderKey}"
 
     print(f"{bucket}/{Key}")
 
-    objects = s3.list_objects_v2(Bucket=bucket, Prefix=Key)
-    filtered_objects = filterFileList(objects, filter)
-
-#    print(objects)
-#    filtered_objects = filterFileList(objects, Key)
-#    filtered_objects = [obj for obj in objects.get('Contents', [])]
-#    print(filtered_objects)
-
     # Chiedi all'utente il numero di file da visualizzare
     if num_files is None:
         num_files = input("\nInserisci il numero di file da visualizzare: ")
 
-    if num_files.strip() == "":
+    if str(num_files).strip() == "":
         num_files = 10  # Imposta un valore predefinito se l'utente non inserisce nulla
         print(f"\nVerranno visualizzati i primi {num_files} file...")
 
     num_files = int(num_files)
 
-    # Ordina gli oggetti per data di modifica in ordine decrescente
-    filtered_objects.sort(key=lambda x: x['LastModified'], reverse=True)
-
-    # Prendi i primi "num_files" oggetti
-    recent_objects = filtered_objects[:num_files]
+    # Mantiene solo i primi "num_files" oggetti per data di modifica, in streaming sulle pagine
+    if cache is not None:
+        recent_objects = _newestObjects(_iterCachedS3Objects(cache, bucket, Key, filter, s3=s3), num_files)
+    elif max_workers or shard_alphabet:
+        recent_objects = listS3ObjectsSharded(bucket, Key, filter, None, num_files, max_workers or 8, shard_alphabet, s3=s3)
+    else:
+        recent_objects = _newestObjects(iterS3Objects(bucket, Key, filter, s3=s3), num_files)
 
     # Inizializza la variabile i a 0
     i = 0
@@ -534,11 +1125,459 @@ def getFileNamesAndDates(files, objects, path_list, name_list, date_list):
             print(f"\nNumero '{file_number}' non valido. Ignorato.\n")
             exit(1)
 
-def getTempCredentials(homeDir, configJson):
+# Cache delle credenziali SSO (in memoria e su disco), per profilo, con scadenza
+CREDENTIAL_REFRESH_MARGIN = 300  # secondi prima della scadenza in cui le credenziali vanno rinnovate
+CREDENTIAL_DEFAULT_LIFETIME = 3600  # durata assunta se il credential manager non indica la scadenza
+_LAST_PROFILE = '__last__'
+_credential_cache = {}
+_credential_cache_lock = threading.Lock()
+
+def _credential_cache_path(homeDir):
+    return os.path.join(homeDir, ".aws", "mylib_credential_cache.json")
+
+def _read_credential_cache_file(homeDir):
+    try:
+        with open(_credential_cache_path(homeDir), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _credentials_valid(entry, margin=None):
+    """True se le credenziali in cache scadono oltre il margine di rinnovo"""
+    if not entry or not entry.get('expiration'):
+        return False
+    expiration = datetime.fromisoformat(entry['expiration'])
+    margin = CREDENTIAL_REFRESH_MARGIN if margin is None else margin
+    return expiration - datetime.now(timezone.utc) > timedelta(seconds=margin)
+
+def get_cached_credentials(homeDir, profile=None, margin=None):
+    """Restituisce le credenziali in cache per il profilo (default: l'ultimo usato) se ancora valide
+    oltre il margine (default CREDENTIAL_REFRESH_MARGIN secondi)"""
+    key = profile or _LAST_PROFILE
+    with _credential_cache_lock:
+        entry = _credential_cache.get(key)
+        if not _credentials_valid(entry, margin):
+            entry = _read_credential_cache_file(homeDir).get(key)
+            if not _credentials_valid(entry, margin):
+                return None
+            _credential_cache[key] = entry
+    return entry
+
+def store_cached_credentials(homeDir, entry):
+    """Salva le credenziali in cache (memoria e file con permessi 600), anche come ultimo profilo usato"""
+    with _credential_cache_lock:
+        _credential_cache[entry['profile']] = entry
+        _credential_cache[_LAST_PROFILE] = entry
+        cache = _read_credential_cache_file(homeDir)
+        cache = {k: v for k, v in cache.items() if _credentials_valid(v, margin=0)}
+        cache[entry['profile']] = entry
+        cache[_LAST_PROFILE] = entry
+        path = _credential_cache_path(homeDir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, path)
+
+def clear_credential_cache(homeDir=None):
+    """Svuota la cache delle credenziali in memoria e, se indicata la home, anche quella su disco"""
+    with _credential_cache_lock:
+        _credential_cache.clear()
+        if homeDir:
+            try:
+                os.remove(_credential_cache_path(homeDir))
+            except FileNotFoundError:
+                pass
+
+class CredentialStore:
+    """Directory dedicata ai file di credenziali temporanee, indicizzata da un manifest JSON.
+
+    Il manifest tiene per ogni file profilo, timestamp, scadenza e path: la ricerca dei file validi e la
+    pulizia di quelli scaduti lavorano sulle sole entry, senza rileggere la directory né dipendere dalla
+    directory corrente. La directory viene scandita (os.scandir) solo per ricostruire un manifest
+    mancante o illeggibile.
+    """
+
+    MANIFEST = 'manifest.json'
+    FILE_PATTERN = re.compile(r'^(?P<profile>.+)_(?P<timestamp>\d{12})\.[^.]+$')
+
+    def __init__(self, directory=None, home_dir=None, ttl=CREDENTIAL_DEFAULT_LIFETIME):
+        """Inizializza lo store
+
+        Args:
+            directory: Directory dei file (default MYLIB_CREDENTIAL_STORE o <home>/.mylib/credentials)
+            home_dir: Home directory (es. quella scelta con createHomeDirPath); default la home dell'utente
+            ttl: Secondi di validità di un file dal suo timestamp, se non indicata una scadenza esplicita
+        """
+        if directory is None:
+            directory = os.environ.get('MYLIB_CREDENTIAL_STORE') or os.path.join(
+                home_dir or os.path.expanduser('~'), '.mylib', 'credentials')
+        self.directory = directory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = None
+        self._manifest_mtime = None
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, self.MANIFEST)
+
+    def _entry(self, name, profile, timestamp, expires_at=None):
+        if expires_at is None:
+            expires_at = datetime.strptime(timestamp, "%Y%m%d%H%M").astimezone(timezone.utc) + timedelta(seconds=self.ttl)
+        expires_at = expires_at.astimezone(timezone.utc)
+        return {
+            'profile': profile,
+            'timestamp': timestamp,
+            'expires_at': expires_at.isoformat(),
+            'path': os.path.join(self.directory, name),
+        }
+
+    def _expires_at(self, entry):
+        """Scadenza dell'entry come datetime UTC (il confronto tra stringhe ISO non regge offset diversi o 'Z')"""
+        try:
+            expires_at = datetime.fromisoformat(entry['expires_at'].replace('Z', '+00:00'))
+        except (KeyError, AttributeError, ValueError):
+            # Entry scritta a mano o corrotta: vale la scadenza calcolata dal timestamp del nome
+            return datetime.strptime(entry['timestamp'], "%Y%m%d%H%M").astimezone(timezone.utc) + timedelta(seconds=self.ttl)
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at
+
+    def _load(self):
+        """Entry del manifest, riletto solo se modificato da un altro processo"""
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return self._rebuild()
+        if self._entries is None or mtime != self._manifest_mtime:
+            try:
+                with open(self.manifest_path, 'r') as f:
+                    self._entries = json.load(f)['entries']
+                self._manifest_mtime = mtime
+            except (OSError, ValueError, KeyError):
+                return self._rebuild()
+        return self._entries
+
+    def _save(self, entries):
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': 1, 'entries': entries}, f)
+        os.replace(tmp_path, self.manifest_path)
+        self._entries = entries
+        self._manifest_mtime = os.stat(self.manifest_path).st_mtime_ns
+
+    def _rebuild(self):
+        """Ricostruisce il manifest dai nomi dei file presenti nella directory"""
+        entries = {}
+        with os.scandir(self.directory) as it:
+            for dir_entry in it:
+                match = self.FILE_PATTERN.match(dir_entry.name)
+                if match and dir_entry.is_file():
+                    entries[dir_entry.name] = self._entry(dir_entry.name, match['profile'], match['timestamp'])
+        self._save(entries)
+        return entries
+
+    def rebuild(self):
+        """Forza la ricostruzione del manifest (es. dopo aver copiato file a mano nella directory)"""
+        with self._lock:
+            return dict(self._rebuild())
+
+    def add(self, profile, content, timestamp=None, expires_at=None):
+        """Salva il contenuto delle credenziali come <profile>_<YYYYMMDDHHMM>.txt e restituisce il path"""
+        timestamp = timestamp or time.strftime("%Y%m%d%H%M")
+        name = f"{profile}_{timestamp}.txt"
+        with self._lock:
+            entries = dict(self._load())
+            entry = self._entry(name, profile, timestamp, expires_at)
+            fd = os.open(entry['path'], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                f.write(content)
+            entries[name] = entry
+            self._save(entries)
+        return entry['path']
+
+    def entries(self, prefix="", include_expired=False):
+        """Entry (dal manifest) dei file il cui profilo inizia con prefix, dalla più recente"""
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            entries = self._load()
+        selected = [e for e in entries.values()
+                    if e['profile'].startswith(prefix) and (include_expired or self._expires_at(e) > now)]
+        return sorted(selected, key=lambda e: e['timestamp'], reverse=True)
+
+    def cleanup(self):
+        """Elimina i file scaduti (e le entry dei file spariti) e restituisce i path rimossi"""
+        now = datetime.now(timezone.utc)
+        removed = []
+        with self._lock:
+            entries = dict(self._load())
+            for name, entry in list(entries.items()):
+                if self._expires_at(entry) > now:
+                    continue
+                try:
+                    os.remove(entry['path'])
+                    removed.append(entry['path'])
+                except FileNotFoundError:
+                    pass
+                del entries[name]
+            if len(entries) != len(self._entries):
+                self._save(entries)
+        return removed
+
+def _write_aws_credentials_file(homeDir, access_key, secret_key, session_token):
+    """Scrive ~/.aws/credentials (profilo default), solo se il contenuto è cambiato"""
+    aws_credentials_path = os.path.join(homeDir, ".aws", "credentials")
+    os.makedirs(os.path.dirname(aws_credentials_path), exist_ok=True)
+
+    # Scrivi le credenziali in formato AWS
+    content = (
+        "[default]\n"
+        f"aws_access_key_id = {access_key}\n"
+        f"aws_secret_access_key = {secret_key}\n"
+        f"aws_session_token = {session_token}\n"
+        f"aws_security_token = {session_token}\n"  # Stesso token per compatibilità
+    )
+    try:
+        with open(aws_credentials_path, 'r') as f:
+            if f.read() == content:
+                return aws_credentials_path
+    except OSError:
+        pass
+    with open(aws_credentials_path, 'w') as f:
+        f.write(content)
+    return aws_credentials_path
+
+# Credenziali auto-rinnovanti (RefreshableCredentials di botocore) condivise da tutti i client della libreria
+CREDENTIAL_ADVISORY_REFRESH = 600  # secondi prima della scadenza in cui avviare il rinnovo in background
+CREDENTIAL_MANDATORY_REFRESH = 120  # secondi prima della scadenza in cui il rinnovo diventa bloccante
+_refreshable_credentials = None
+_refresh_stop = None
+
+def _refreshable_botocore_session():
+    """Sessione botocore la cui catena di credenziali restituisce le credenziali auto-rinnovanti"""
+    import botocore.session
+    from botocore.credentials import CredentialProvider
+
+    class _MylibCredentialProvider(CredentialProvider):
+        METHOD = 'mylib-sso'
+        CANONICAL_NAME = 'mylib-sso'
+
+        def __init__(self, credentials):
+            super().__init__()
+            self._credentials = credentials
+
+        def load(self):
+            return self._credentials
+
+    session = botocore.session.Session()
+    session.get_component('credential_provider').insert_before('env', _MylibCredentialProvider(_refreshable_credentials))
+    return session
+
+def enable_auto_refresh_credentials(homeDir, configJson=None, profile=None):
+    """Attiva credenziali che si rinnovano da sole tramite il credential manager SSO.
+
+    Tutti i client creati da get_aws_client usano da qui in poi un'unica RefreshableCredentials: un thread
+    in background la rinnova CREDENTIAL_ADVISORY_REFRESH secondi prima della scadenza, così le chiamate
+    S3/DynamoDB non si bloccano né falliscono per token scaduti. Senza profile vale quello delle prime
+    credenziali ottenute, che resta fisso per tutti i rinnovi. Restituisce le credenziali create.
+    """
+    global _refreshable_credentials, _refresh_stop
+    _get_boto3()
+    from botocore.credentials import RefreshableCredentials
+
+    def _refresh(headless=True):
+        # Credenziali già rinnovate (es. da un altro processo) oppure nuovo giro SSO; i rinnovi successivi
+        # al primo girano nel thread di background o nei thread delle richieste, quindi senza prompt
+        nonlocal profile
+        entry = get_cached_credentials(homeDir, profile, margin=CREDENTIAL_ADVISORY_REFRESH)
+        if entry is None:
+            getTempCredentials(homeDir, configJson or {}, profile, use_cache=False, headless=headless)
+            entry = get_cached_credentials(homeDir, profile, margin=0)
+        if entry is None:
+            raise RuntimeError("Credenziali SSO non disponibili per il rinnovo")
+        # Il profilo resta quello del primo rinnovo: senza, i successivi userebbero l'ultimo profilo in cache o
+        # il file SSO più recente, anche di un altro account
+        profile = profile or entry['profile']
+        # Mantiene allineate anche le variabili d'ambiente (es. per eventuali processi figli)
+        os.environ['AWS_ACCESS_KEY_ID'] = entry['access_key']
+        os.environ['AWS_SECRET_ACCESS_KEY'] = entry['secret_key']
+        os.environ['AWS_SESSION_TOKEN'] = entry['session_token']
+        os.environ['AWS_SECURITY_TOKEN'] = entry['session_token']
+        return {
+            'access_key': entry['access_key'],
+            'secret_key': entry['secret_key'],
+            'token': entry['session_token'],
+            'expiry_time': entry['expiration'],
+        }
+
+    disable_auto_refresh_credentials()
+    credentials = RefreshableCredentials.create_from_metadata(
+        _refresh(headless=None), refresh_using=_refresh, method='mylib-sso',
+        advisory_timeout=CREDENTIAL_ADVISORY_REFRESH, mandatory_timeout=CREDENTIAL_MANDATORY_REFRESH,
+    )
+    stop = threading.Event()
+
+    def _refresh_loop():
+        # Se il rinnovo non produce credenziali oltre la finestra advisory (o fallisce) i tentativi
+        # successivi si diradano con backoff esponenziale, fino alla finestra mandatory
+        backoff = 1
+        while not stop.is_set():
+            entry = get_cached_credentials(homeDir, profile, margin=0)
+            remaining = None
+            if entry is not None:
+                remaining = (datetime.fromisoformat(entry['expiration']) - datetime.now(timezone.utc)).total_seconds()
+            if remaining is None or remaining <= CREDENTIAL_ADVISORY_REFRESH:
+                wait = backoff
+                backoff = min(backoff * 2, CREDENTIAL_MANDATORY_REFRESH)
+            else:
+                wait = remaining - CREDENTIAL_ADVISORY_REFRESH + 1
+                backoff = 1
+            if stop.wait(wait):
+                return
+            try:
+                # Dentro la finestra advisory get_frozen_credentials esegue il rinnovo in questo thread
+                credentials.get_frozen_credentials()
+            except Exception as e:
+                print(f"⚠️ Rinnovo credenziali in background fallito: {e}")
+
+    _refreshable_credentials, _refresh_stop = credentials, stop
+    threading.Thread(target=_refresh_loop, name='mylib-credential-refresh', daemon=True).start()
+    invalidate_aws_clients()
+    return credentials
+
+def disable_auto_refresh_credentials():
+    """Ferma il rinnovo in background e torna alle credenziali della catena di default"""
+    global _refreshable_credentials, _refresh_stop
+    if _refresh_stop is not None:
+        _refresh_stop.set()
+    _refreshable_credentials, _refresh_stop = None, None
+    invalidate_aws_clients()
+
+def _convert_sso_file(homeDir, selected_file):
+    """Converte un file del credential manager SSO nel file credenziali AWS e aggiorna la cache"""
+    if not selected_file or len(selected_file) < 5:
+        raise CredentialSetupError("File SSO non valido o incompleto")
+
+    # Il processo SSO deve permettere all'utente di scegliere il profilo
+    # Controlla se l'utente ha selezionato un profilo ENEL (che contiene 'esol-')
+    profile_name = selected_file[1] if len(selected_file) > 1 else "unknown"
+    timestamp = selected_file[2] if len(selected_file) > 2 else "N/A"
+
+    print(f"🎯 Profilo selezionato dall'utente: {profile_name} (timestamp: {timestamp})")
+
+    # IMPORTANTE: Non forzare il nome del profilo! Usa quello selezionato dall'utente
+    if 'esol-' not in profile_name:
+        print("⚠️  ATTENZIONE: Il profilo selezionato non sembra essere un profilo ENEL")
+        print(f"    Profilo: {profile_name}")
+        print("    Per progetti ENEL, assicurati di selezionare un profilo che contiene 'esol-'")
+
+    # Estrai le credenziali dal formato SSO
+    sso_content = selected_file[4]  # Il contenuto delle credenziali
+
+    # Parse del contenuto SSO
+    lines = sso_content.strip().split('\n')
+    access_key = None
+    secret_key = None
+    session_token = None
+    expiration = None
+
+    for i, line in enumerate(lines):
+        if line == 'AccessKeyId' and i + 1 < len(lines):
+            access_key = lines[i + 1]
+        elif line == 'SecretAccessKey' and i + 1 < len(lines):
+            secret_key = lines[i + 1]
+        elif line == 'SessionToken' and i + 1 < len(lines):
+            session_token = lines[i + 1]
+        elif line == 'Expiration' and i + 1 < len(lines):
+            expiration = lines[i + 1]
+
+    if not all([access_key, secret_key, session_token]):
+        raise CredentialSetupError("Credenziali SSO incomplete")
+
+    # Crea file credenziali AWS standard
+    aws_credentials_path = _write_aws_credentials_file(homeDir, access_key, secret_key, session_token)
+
+    # Estrai il nome del ruolo dal profilo selezionato dall'utente
+    if 'esol-' in profile_name and '-' in profile_name:
+        # Per profili ENEL, usa il nome completo del profilo
+        role_arn = profile_name
+        print(f"🎯 Usando nome profilo ENEL selezionato: {role_arn}")
+    elif '-' in profile_name:
+        # Per altri profili come "E-Solution-Prod-IOTSupport-876591523896"
+        parts = profile_name.split('-')
+        # Cerca un account ID (numero di 12 cifre)
+        for part in parts:
+            if part.isdigit() and len(part) >= 10:  # Account ID AWS
+                role_arn = part
+                break
+        else:
+            role_arn = parts[-1]  # Ultimo elemento se nessun match
+        print(f"🎯 Estratto account ID da profilo generico selezionato: {role_arn}")
+    else:
+        role_arn = profile_name
+        print(f"🎯 Usando nome profilo semplice selezionato: {role_arn}")
+
+    # Memorizza le credenziali con la loro scadenza per le chiamate successive. Senza Expiration la
+    # durata si conta dalla data di modifica del file SSO (le credenziali possono avere già ore);
+    # se nemmeno quella è disponibile la scadenza è ignota e le credenziali non vanno in cache
+    try:
+        expires_at = datetime.fromisoformat(expiration.replace('Z', '+00:00')).astimezone(timezone.utc)
+    except (AttributeError, ValueError):
+        try:
+            issued_at = datetime.fromtimestamp(os.path.getmtime(selected_file[0]), timezone.utc)
+            expires_at = issued_at + timedelta(seconds=CREDENTIAL_DEFAULT_LIFETIME)
+        except (OSError, TypeError, ValueError):
+            expires_at = None
+    if expires_at is not None:
+        store_cached_credentials(homeDir, {
+            'profile': profile_name,
+            'role_arn': role_arn,
+            'access_key': access_key,
+            'secret_key': secret_key,
+            'session_token': session_token,
+            'expiration': expires_at.isoformat(),
+        })
+    else:
+        print("⚠️ Scadenza delle credenziali SSO sconosciuta: non vengono salvate in cache")
+
+    print("✅ Credenziali SSO convertite con successo!")
+    return aws_credentials_path, role_arn
+
+
+def _select_sso_file(credential_manager, profile=None):
+    """Sceglie senza menu un file SSO valido: quello del profilo richiesto o, in mancanza, il più recente"""
+    valid_files = [f for f in credential_manager.get_valid_credential_files() if len(f) >= 5]
+    if profile:
+        valid_files = [f for f in valid_files if f[1] == profile]
+    if not valid_files:
+        wanted = f" per il profilo {profile}" if profile else ""
+        raise InteractionRequiredError(f"Nessuna credenziale SSO valida{wanted}: eseguire prima il login SSO interattivo")
+    return max(valid_files, key=lambda f: f[2])
+
+def getTempCredentials(homeDir, configJson, profile=None, use_cache=True, headless=None):
     """
     Ottiene credenziali temporanee AWS tramite SSO usando il tuo credential_manager.py
+
+    Se per il profilo richiesto (default: MYLIB_PROFILE; in modalità non interattiva anche l'ultimo usato) ci
+    sono credenziali in cache non prossime alla scadenza, vengono restituite subito senza ripetere il
+    processo SSO. Senza profilo indicato, in modalità interattiva si passa sempre dal menu SSO, così
+    l'utente può scegliere un profilo diverso dall'ultimo. In modalità non
+    interattiva il menu SSO non viene mostrato: si usa il file valido del profilo (o il più recente) e,
+    se manca, si solleva InteractionRequiredError.
     """
-    if _USE_SSO:
+    profile = profile or os.environ.get('MYLIB_PROFILE')
+    if use_cache and (profile or _is_headless(headless)):
+        cached = get_cached_credentials(homeDir, profile)
+        if cached:
+            aws_credentials_path = _write_aws_credentials_file(homeDir, cached['access_key'], cached['secret_key'], cached['session_token'])
+            print(f"♻️ Credenziali in cache per {cached['profile']} valide fino a {cached['expiration']}")
+            return aws_credentials_path, cached['role_arn']
+
+    if _bootstrap_sso(headless):
         try:
             print("🔐 === Autenticazione AWS SSO ===")
             
@@ -547,6 +1586,9 @@ def getTempCredentials(homeDir, configJson):
             
             # Prima cleanup file scaduti
             credential_manager.cleanup_expired_files()
+
+            if _is_headless(headless):
+                return _convert_sso_file(homeDir, _select_sso_file(credential_manager, profile))
             
             # Controlla se ci sono file validi esistenti (solo per info, non per bloccare)
             valid_files = credential_manager.get_valid_credential_files()
@@ -593,7 +1635,7 @@ def getTempCredentials(homeDir, configJson):
                     import sys
                     sys.exit(0)
                 else:
-                    raise Exception("Nessun file SSO valido disponibile dopo il processo di autenticazione")
+                    raise CredentialSetupError("Nessun file SSO valido disponibile dopo il processo di autenticazione")
             
             # CORREZIONE CRITICA: Non prendere il file più recente!
             # Il problema è che quando l'utente seleziona un profilo nel menu del credential manager,
@@ -661,90 +1703,23 @@ def getTempCredentials(homeDir, configJson):
                     selected_file = files_sorted[0]
                     print("⚠️  Fallback: usando file più recente disponibile")
             
-            if not selected_file or len(selected_file) < 5:
-                raise Exception("File SSO non valido o incompleto")
-            
-            # Il processo SSO deve permettere all'utente di scegliere il profilo
-            # Controlla se l'utente ha selezionato un profilo ENEL (che contiene 'esol-')
-            profile_name = selected_file[1] if len(selected_file) > 1 else "unknown"
-            timestamp = selected_file[2] if len(selected_file) > 2 else "N/A"
-            
-            print(f"🎯 Profilo selezionato dall'utente: {profile_name} (timestamp: {timestamp})")
-            
-            # IMPORTANTE: Non forzare il nome del profilo! Usa quello selezionato dall'utente
-            if 'esol-' not in profile_name:
-                print("⚠️  ATTENZIONE: Il profilo selezionato non sembra essere un profilo ENEL")
-                print(f"    Profilo: {profile_name}")
-                print("    Per progetti ENEL, assicurati di selezionare un profilo che contiene 'esol-'")
-            
-            # Estrai le credenziali dal formato SSO
-            sso_content = selected_file[4]  # Il contenuto delle credenziali
-            
-            # Parse del contenuto SSO
-            lines = sso_content.strip().split('\n')
-            access_key = None
-            secret_key = None
-            session_token = None
-            
-            for i, line in enumerate(lines):
-                if line == 'AccessKeyId' and i + 1 < len(lines):
-                    access_key = lines[i + 1]
-                elif line == 'SecretAccessKey' and i + 1 < len(lines):
-                    secret_key = lines[i + 1]
-                elif line == 'SessionToken' and i + 1 < len(lines):
-                    session_token = lines[i + 1]
-            
-            if not all([access_key, secret_key, session_token]):
-                raise Exception("Credenziali SSO incomplete")
-            
-            # Crea file credenziali AWS standard
-            aws_credentials_path = os.path.join(homeDir, ".aws", "credentials")
-            os.makedirs(os.path.dirname(aws_credentials_path), exist_ok=True)
-            
-            # Scrivi le credenziali in formato AWS
-            with open(aws_credentials_path, 'w') as f:
-                f.write("[default]\n")
-                f.write(f"aws_access_key_id = {access_key}\n")
-                f.write(f"aws_secret_access_key = {secret_key}\n")
-                f.write(f"aws_session_token = {session_token}\n")
-                f.write(f"aws_security_token = {session_token}\n")  # Stesso token per compatibilità
-            
-            # Estrai il nome del ruolo dal profilo selezionato dall'utente
-            if 'esol-' in profile_name and '-' in profile_name:
-                # Per profili ENEL, usa il nome completo del profilo
-                role_arn = profile_name
-                print(f"🎯 Usando nome profilo ENEL selezionato: {role_arn}")
-            elif '-' in profile_name:
-                # Per altri profili come "E-Solution-Prod-IOTSupport-876591523896"
-                parts = profile_name.split('-')
-                # Cerca un account ID (numero di 12 cifre)
-                for part in parts:
-                    if part.isdigit() and len(part) >= 10:  # Account ID AWS
-                        role_arn = part
-                        break
-                else:
-                    role_arn = parts[-1]  # Ultimo elemento se nessun match
-                print(f"🎯 Estratto account ID da profilo generico selezionato: {role_arn}")
-            else:
-                role_arn = profile_name
-                print(f"🎯 Usando nome profilo semplice selezionato: {role_arn}")
-            
-            print("✅ Credenziali SSO convertite con successo!")
-            return aws_credentials_path, role_arn
+            return _convert_sso_file(homeDir, selected_file)
             
+        except CredentialSetupError:
+            raise
         except Exception as e:
             print(f"❌ Errore SSO: {e}")
             import traceback
             traceback.print_exc()
-            raise Exception(f"Autenticazione SSO fallita: {e}")
+            raise CredentialSetupError(f"Autenticazione SSO fallita: {e}") from e
     else:
-        raise Exception("AWS SSO Credential Manager non disponibile. Installare il modulo credential_manager.")
+        raise CredentialSetupError("AWS SSO Credential Manager non disponibile. Installare il modulo credential_manager.")
 
-def getRoleArn(homeDir, configJson):
+def getRoleArn(homeDir, configJson, headless=None):
     """
     Ottiene il ruolo ARN dalle credenziali SSO
     """
-    if _USE_SSO:
+    if _bootstrap_sso(headless):
         try:
             # Per SSO, estrai il ruolo dall'ultimo file utilizzato
             credential_manager = AWSCredentialManager()
@@ -757,13 +1732,15 @@ def getRoleArn(homeDir, configJson):
                 configJson["awsCredentials"]["AWSProjectRole"] = role_arn
                 return role_arn
             else:
-                raise Exception("Nessun file SSO valido per estrarre il ruolo")
+                raise CredentialSetupError("Nessun file SSO valido per estrarre il ruolo")
                 
+        except CredentialSetupError:
+            raise
         except Exception as e:
             print(f"⚠️ Errore estrazione ruolo SSO: {e}")
-            raise Exception(f"Impossibile ottenere ruolo da SSO: {e}")
+            raise CredentialSetupError(f"Impossibile ottenere ruolo da SSO: {e}")
     else:
-        raise Exception("AWS SSO Credential Manager non disponibile")
+        raise CredentialSetupError("AWS SSO Credential Manager non disponibile")
 
 def extract_string(fullString):
     extracted_str = None
@@ -779,7 +1756,7 @@ def extract_string(fullString):
         print(f"🔧 extract_string: '{fullString}' -> '{extracted_str}'")
     return extracted_str
 
-def saveTempCredentials(tempCredentials, role_arn, rows):
+def saveTempCredentials(tempCredentials, role_arn, rows, store=None):
     with open(tempCredentials, "r") as file:
         credentials_content = file.read()
 
@@ -790,26 +1767,45 @@ def saveTempCredentials(tempCredentials, role_arn, rows):
         # Crea il nome del file utilizzando la data e l'ora
         projConf = f"{role_arn}_{current_time}.txt"
 
-        if role_arn != None:
+        if store is not None:
+            # Salva il file nello store, registrandolo nel manifest
+            projConf = store.add(role_arn, credentials_content, current_time)
+        else:
             # Crea il file e copia le credenziali temporanee al suo interno
             with open(projConf, "w") as file:
                 file.write(credentials_content)
 
-            # inserisci i valori delle chiavi nel file, all'interno di una lista
-            f = open(tempCredentials, "r")
-            for line in f:
-                rows.append(line.partition(" = ")[2].rstrip())
-                #print(i)
-                #print(rows[i])
-                #i+=1
-            f.close()
+        # inserisci i valori delle chiavi nel file, all'interno di una lista
+        f = open(tempCredentials, "r")
+        for line in f:
+            rows.append(line.partition(" = ")[2].rstrip())
+            #print(i)
+            #print(rows[i])
+            #i+=1
+        f.close()
     else:
         print("\nImpossibile reperire le informazioni di ruolo, Riprova ad eseguire lo script!\n")
     return projConf
 
+# Parametri di default del transfer manager di boto3 per upload/download
+MB = 1024 * 1024
+TRANSFER_MULTIPART_THRESHOLD = 8 * MB
+TRANSFER_MULTIPART_CHUNKSIZE = 8 * MB
+TRANSFER_MAX_CONCURRENCY = 10
+
+def getTransferConfig(multipart_threshold=None, multipart_chunksize=None, max_concurrency=None):
+    """Crea un TransferConfig di boto3 (soglia multipart, dimensione chunk, concorrenza per file)"""
+    _get_boto3()
+    from boto3.s3.transfer import TransferConfig
+    return TransferConfig(
+        multipart_threshold=multipart_threshold or TRANSFER_MULTIPART_THRESHOLD,
+        multipart_chunksize=multipart_chunksize or TRANSFER_MULTIPART_CHUNKSIZE,
+        max_concurrency=max_concurrency or TRANSFER_MAX_CONCURRENCY,
+    )
+
 def downloadFileFromS3(bucket, key, local_path):
-    # Crea il client s3
-    s3 = boto3.client('s3')
+    # Client s3 condiviso
+    s3 = get_aws_client('s3')
 
     # Scarica il file da S3
     try:
@@ -818,66 +1814,239 @@ def downloadFileFromS3(bucket, key, local_path):
     except Exception as e:
         print(f"\nErrore durante il download del file '{key}': {str(e)}\n")
 
-def uploadFileToS3(local_files, bucket, subfolder, singleFile):
-    if singleFile is not None:
-        local_file = singleFile
-        uploadToS3(local_file, bucket, subfolder)
+def _local_download_paths(keys, local_dir, prefix=None):
+    """Percorso locale di ogni chiave: il path della chiave relativo a prefix (default: la directory comune
+    a tutte le chiavi), così chiavi con lo stesso nome file sotto prefissi diversi non si sovrascrivono.
+
+    Con chiavi tutte nella stessa directory il risultato è il solo nome file. I componenti '.' e '..'
+    vengono scartati, quindi i file restano sempre dentro local_dir.
+    """
+    parts = {key: [p for p in key.split('/') if p not in ('', '.', '..')] for key in keys}
+    if prefix is None:
+        common = os.path.commonprefix([p[:-1] for p in parts.values()]) if parts else []
     else:
-        for local_file in local_files:
-            uploadToS3(local_file, bucket, subfolder)
+        common = [p for p in prefix.split('/') if p not in ('', '.', '..')]
+    paths = {}
+    for key, key_parts in parts.items():
+        relative = key_parts[len(common):] if key_parts[:len(common)] == common else key_parts
+        paths[key] = os.path.join(local_dir, *(relative or key_parts[-1:] or ['_']))
+    return paths
+
+def downloadFilesFromS3(bucket, path_list, local_dir=".", max_workers=8, transfer_config=None, retries=3, backoff=0.5,
+                        prefix=None):
+    """Scarica in parallelo le chiavi di path_list (es. prodotta da getFileNamesAndDates) in local_dir.
+
+    Ogni file mantiene il path della chiave relativo a prefix (default: la directory comune a tutte le
+    chiavi), creando le sottodirectory necessarie; chiavi ripetute vengono scaricate una sola volta.
+    Gli oggetti oltre la soglia multipart del TransferConfig vengono scaricati con GET a range paralleli;
+    gli errori transitori vengono ritentati con backoff esponenziale. Restituisce un esito per chiave,
+    nello stesso ordine di path_list (chiavi: key, bucket, file, success, bytes, seconds, attempts, error).
+    """
+    keys = list(path_list or [])
+    if not keys:
+        return []
+    if transfer_config is None:
+        transfer_config = getTransferConfig()
+    os.makedirs(local_dir, exist_ok=True)
+    local_paths = _local_download_paths(keys, local_dir, prefix)
+
+    s3 = get_aws_client('s3', max_pool_connections=max_workers * transfer_config.max_request_concurrency)
+
+    def _download(key):
+        local_path = local_paths[key]
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        result = {'key': key, 'bucket': bucket, 'file': local_path, 'success': False, 'bytes': 0, 'seconds': 0.0, 'attempts': 0, 'error': None}
+        start = time.perf_counter()
+        try:
+            _, result['attempts'] = _call_with_retries(lambda: s3.download_file(bucket, key, local_path, Config=transfer_config), retries, backoff)
+            result['bytes'] = os.path.getsize(local_path)
+            result['success'] = True
+        except Exception as e:
+            result['attempts'] = getattr(e, 'mylib_attempts', result['attempts'])
+            result['error'] = str(e)
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+    unique_keys = list(dict.fromkeys(keys))
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique_keys)))) as executor:
+        results = dict(zip(unique_keys, executor.map(_download, unique_keys)))
+    return [dict(results[key]) for key in keys]
+
+def uploadFileToS3(local_files, bucket, subfolder, singleFile, max_workers=8, transfer_config=None):
+    """Carica uno o più file su S3 in parallelo, tramite un unico client condiviso.
+
+    Restituisce un esito per file, nello stesso ordine dei file in input
+    (chiavi: file, bucket, key, success, bytes, seconds, error).
+    """
+    files = [singleFile] if singleFile is not None else list(local_files or [])
+    if not files:
+        return []
+    if transfer_config is None:
+        transfer_config = getTransferConfig()
 
-def uploadToS3(local_file, bucket, subfolder):
-    import subprocess
+    s3 = get_aws_client('s3', max_pool_connections=max_workers * transfer_config.max_request_concurrency)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(files)))) as executor:
+        return list(executor.map(lambda local_file: uploadToS3(local_file, bucket, subfolder, s3, transfer_config), files))
 
+def uploadToS3(local_file, bucket, subfolder, s3=None, transfer_config=None):
+    """Carica un singolo file su S3 con il transfer manager di boto3 e ne restituisce l'esito"""
     remote_file = os.path.basename(local_file)
-    # Specifica il percorso del bucket S3 di destinazione
-    bucket_s3_dest = f's3://{bucket}/{subfolder}/{remote_file}'
-    
-    # Esegui il comando aws s3 cp utilizzando subprocess
-    comando = ['aws', 's3', 'cp', local_file, bucket_s3_dest]
+    # Specifica la chiave S3 di destinazione
+    key = f"{subfolder}/{remote_file}" if subfolder else remote_file
+
+    if s3 is None:
+        s3 = get_aws_client('s3')
+    if transfer_config is None:
+        transfer_config = getTransferConfig()
+
+    result = {'file': local_file, 'bucket': bucket, 'key': key, 'success': False, 'bytes': 0, 'seconds': 0.0, 'error': None}
+    start = time.perf_counter()
     try:
-        subprocess.run(comando, check=True)
-        print(f"\nFile '{local_file}' uploadato con successo su S3.\n")
+        s3.upload_file(local_file, bucket, key, Config=transfer_config)
+        result['bytes'] = os.path.getsize(local_file)
+        result['success'] = True
     except Exception as e:
-        print(f"\nErrore durante l'upload del file su S3: {str(e)}\n")
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - start
+    return result
 
 def deleteFileFromS3(bucket, remote_file_path):
-    import subprocess
-
     # Controlla se non sono stati inseriti tutti i parametri necessari
     if not (bucket and remote_file_path):
         print("Non sono stati forniti tutti i parametri necessari per eliminare un file da S3.")
         return
 
-    # Specifica il percorso completo del file da eliminare, incluso il bucket
-    bucket_s3_dest = f's3://{bucket}/{remote_file_path}'
-
-    # Esegui il comando aws s3 rm utilizzando subprocess
-    comando = ['aws', 's3', 'rm', bucket_s3_dest]
-    try:
-        subprocess.run(comando, check=True)
+    # Elimina la chiave tramite DeleteObjects (nessun processo aws cli)
+    report = deleteFilesFromS3(bucket, [remote_file_path])
+    if report['errors']:
+        print(f"\nErrore durante l'eliminazione del file da S3: {report['errors'][0]['message']}\n")
+    else:
         print(f"\nFile '{remote_file_path}' eliminato con successo dal bucket S3 {bucket}.\n")
-    except subprocess.CalledProcessError as e:
-        print(f"\nErrore durante l'eliminazione del file da S3: {e}\n")
 
-def listFileFromS3(bucket, remote_file_path):
-    import subprocess
+# Numero massimo di chiavi per singola richiesta DeleteObjects
+S3_DELETE_BATCH_SIZE = 1000
 
+def _batched(iterable, size):
+    """Suddivide un iterabile in liste di al più `size` elementi, senza materializzarlo"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def deleteFilesFromS3(bucket, keys=None, prefix=None, filter="", num_days=None, older_than_days=None,
+                      dry_run=False, max_workers=4, retries=3, backoff=0.5):
+    """Elimina chiavi S3 in blocco con DeleteObjects (1000 chiavi per richiesta, batch in parallelo).
+
+    Le chiavi arrivano da `keys` oppure da `prefix` con gli stessi criteri di getFileListSortedByDate
+    (`filter` per sottostringa, `num_days` per gli oggetti recenti) più `older_than_days` per le pulizie.
+    Con dry_run=True non elimina nulla. Restituisce un report con le chiavi selezionate, il numero di
+    chiavi eliminate e gli errori per chiave (key, code, message).
+    """
+    if keys is None:
+        if prefix is None:
+            raise ValueError("Specificare keys oppure prefix")
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(days=int(num_days)) if num_days is not None else None
+        objects = iterS3Objects(bucket, prefix, filter, since)
+        if older_than_days is not None:
+            cutoff = now - timedelta(days=int(older_than_days))
+            objects = (obj for obj in objects if obj['LastModified'].replace(tzinfo=timezone.utc) < cutoff)
+        keys = (obj['Key'] for obj in objects)
+
+    report = {'bucket': bucket, 'dry_run': dry_run, 'keys': [], 'deleted': 0, 'batches': 0, 'errors': []}
+    s3 = None if dry_run else get_aws_client('s3', max_pool_connections=max_workers)
+
+    def _deleteBatch(batch):
+        request = {'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+        try:
+            response, _ = _call_with_retries(lambda: s3.delete_objects(Bucket=bucket, Delete=request), retries, backoff)
+        except Exception as e:
+            return [{'key': key, 'code': type(e).__name__, 'message': str(e)} for key in batch]
+        return [{'key': err.get('Key'), 'code': err.get('Code'), 'message': err.get('Message')}
+                for err in response.get('Errors', [])]
+
+    def _collect(batch, errors):
+        report['batches'] += 1
+        report['keys'].extend(batch)
+        report['deleted'] += len(batch) - len(errors)
+        report['errors'].extend(errors)
+
+    if dry_run:
+        for batch in _batched(keys, S3_DELETE_BATCH_SIZE):
+            _collect(batch, [])
+        report['deleted'] = 0
+        return report
+
+    # Mantiene in volo al più 2 * max_workers batch, così l'elenco delle chiavi resta in streaming
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        pending = []
+        for batch in _batched(keys, S3_DELETE_BATCH_SIZE):
+            pending.append((batch, executor.submit(_deleteBatch, batch)))
+            if len(pending) >= 2 * max_workers:
+                done_batch, future = pending.pop(0)
+                _collect(done_batch, future.result())
+        for done_batch, future in pending:
+            _collect(done_batch, future.result())
+    return report
+
+class S3ObjectRecord(NamedTuple):
+    """Elemento di un listing S3; per i sotto-prefissi (Delimiter) is_prefix è True e i metadati sono vuoti"""
+    key: str
+    size: int
+    last_modified: Optional[datetime]
+    etag: Optional[str]
+    storage_class: Optional[str]
+    is_prefix: bool = False
+
+    def to_dict(self):
+        record = self._asdict()
+        if self.last_modified is not None:
+            record['last_modified'] = self.last_modified.isoformat()
+        return record
+
+def listFileFromS3(bucket, remote_file_path="", delimiter=None, s3=None, page_size=None):
+    """Generatore sugli oggetti S3 sotto remote_file_path, pagina per pagina, come S3ObjectRecord.
+
+    Con delimiter='/' il listing è "a cartelle": i sotto-prefissi vengono restituiti con is_prefix=True.
+    """
     # Controlla se non sono stati inseriti tutti i parametri necessari
     if not (bucket):
         print("Non è stato fornito il nome del bucket necessario per elencare i file su S3.")
         return
 
-    # Specifica il percorso completo del file da eliminare, incluso il bucket
-    bucket_s3_dest = f's3://{bucket}/{remote_file_path}'
-
-    # Esegui il comando aws s3 rm utilizzando subprocess
-    comando = ['aws', 's3', 'ls', bucket_s3_dest]
-    try:
-        subprocess.run(comando)
-        print(f"\nFiles elencati con successo dal bucket S3 {bucket}.\n")
-    except subprocess.CalledProcessError as e:
-        print(f"\nErrore durante l'enumerazione dei file da S3: {e}\n")
+    if s3 is None:
+        s3 = get_aws_client('s3')
+    params = {'Bucket': bucket, 'Prefix': remote_file_path or ""}
+    if delimiter:
+        params['Delimiter'] = delimiter
+    if page_size:
+        params['PaginationConfig'] = {'PageSize': page_size}
+
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(**params):
+        for prefix in page.get('CommonPrefixes', []):
+            yield S3ObjectRecord(prefix['Prefix'], 0, None, None, None, True)
+        for obj in page.get('Contents', []):
+            yield S3ObjectRecord(
+                obj['Key'],
+                obj.get('Size', 0),
+                obj.get('LastModified'),
+                obj.get('ETag', '').strip('"') or None,
+                obj.get('StorageClass'),
+            )
+
+def writeS3ListingNdjson(records, stream=None):
+    """Scrive i record di listFileFromS3 come JSON newline-delimited (default stdout); restituisce il numero di righe"""
+    if stream is None:
+        stream = sys.stdout
+    count = 0
+    for record in records:
+        stream.write(json.dumps(record.to_dict(), ensure_ascii=False) + "\n")
+        count += 1
+    stream.flush()
+    return count
 
 def enumarateConfigElements(conf):
     for index, role in enumerate(conf):
@@ -904,10 +2073,317 @@ def generateUUID():
     uuidNumber = str(uuid.uuid4())
     return uuidNumber
 
-def get_dynamodb_items(table_name):
-    dynamodb = boto3.client('dynamodb')
-    response = dynamodb.scan(TableName=table_name)
-    return response.get('Items', [])
+def _dynamodb_scan_params(table_name, projection_expression=None, filter_expression=None,
+                          expression_attribute_names=None, expression_attribute_values=None, page_size=None):
+    """Costruisce i parametri di scan/paginator, includendo solo le espressioni fornite"""
+    params = {'TableName': table_name}
+    if projection_expression:
+        params['ProjectionExpression'] = projection_expression
+    if filter_expression:
+        params['FilterExpression'] = filter_expression
+    if expression_attribute_names:
+        params['ExpressionAttributeNames'] = expression_attribute_names
+    if expression_attribute_values:
+        params['ExpressionAttributeValues'] = expression_attribute_values
+    if page_size:
+        params['PaginationConfig'] = {'PageSize': page_size}
+    return params
+
+def iter_dynamodb_items(table_name, projection_expression=None, filter_expression=None,
+                        expression_attribute_names=None, expression_attribute_values=None,
+                        total_segments=1, page_size=None):
+    """Generatore sugli item di una tabella DynamoDB: segue LastEvaluatedKey e restituisce gli item
+    man mano che le pagine arrivano.
+
+    Con total_segments > 1 esegue una parallel scan (Segment/TotalSegments) su un pool di thread;
+    in tal caso l'ordine degli item non è deterministico.
+    """
+    dynamodb = get_aws_client('dynamodb', max_pool_connections=total_segments)
+    params = _dynamodb_scan_params(table_name, projection_expression, filter_expression,
+                                   expression_attribute_names, expression_attribute_values, page_size)
+    paginator = dynamodb.get_paginator('scan')
+
+    if total_segments <= 1:
+        for page in paginator.paginate(**params):
+            yield from page.get('Items', [])
+        return
+
+    # I thread dei segmenti depositano le pagine in una coda limitata (backpressure verso il consumatore)
+    pages = queue.Queue(maxsize=2 * total_segments)
+    stop = threading.Event()
+    done = object()
+
+    def _put(value):
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _scan_segment(segment):
+        try:
+            for page in paginator.paginate(Segment=segment, TotalSegments=total_segments, **params):
+                if not _put(page.get('Items', [])):
+                    return
+        except Exception as e:
+            _put(e)
+        finally:
+            _put(done)
+
+    executor = ThreadPoolExecutor(max_workers=total_segments)
+    try:
+        for segment in range(total_segments):
+            executor.submit(_scan_segment, segment)
+        remaining = total_segments
+        while remaining:
+            value = pages.get()
+            if value is done:
+                remaining -= 1
+            elif isinstance(value, Exception):
+                raise value
+            else:
+                yield from value
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+def get_dynamodb_items(table_name, projection_expression=None, filter_expression=None,
+                       expression_attribute_names=None, expression_attribute_values=None, total_segments=1):
+    """Restituisce tutti gli item della tabella (scan paginata, opzionalmente parallela)"""
+    return list(iter_dynamodb_items(table_name, projection_expression, filter_expression,
+                                    expression_attribute_names, expression_attribute_values, total_segments))
+
+def _dynamodb_number(raw):
+    # Gli interi restano int (più veloci e serializzabili), il resto Decimal come in boto3
+    if raw.lstrip('-').isdigit():
+        return int(raw)
+    from decimal import Decimal
+    return Decimal(raw)
+
+def _decode_attributes(stack):
+    """Svuota uno stack di (contenitore, chiave, valore DynamoDB) decodificando senza ricorsione"""
+    while stack:
+        target, slot, wire = stack.pop()
+        tag, raw = next(iter(wire.items()))
+        if tag == 'M':
+            value = dict.fromkeys(raw)  # preserva l'ordine delle chiavi
+            stack.extend((value, key, child) for key, child in raw.items())
+        elif tag == 'L':
+            value = [None] * len(raw)
+            stack.extend((value, i, child) for i, child in enumerate(raw))
+        elif tag == 'S' or tag == 'B' or tag == 'BOOL':
+            value = raw
+        elif tag == 'N':
+            value = _dynamodb_number(raw)
+        elif tag == 'NULL':
+            value = None
+        elif tag == 'SS' or tag == 'BS':
+            value = set(raw)
+        elif tag == 'NS':
+            value = {_dynamodb_number(n) for n in raw}
+        else:
+            raise ValueError(f"Tipo DynamoDB non supportato: {tag}")
+        target[slot] = value
+
+def from_dynamodb(value):
+    """Converte un singolo valore dal formato DynamoDB ({"S": ...}, {"M": ...}) a Python nativo"""
+    result = [None]
+    _decode_attributes([(result, 0, value)])
+    return result[0]
+
+def deserialize_dynamodb_item(item):
+    """Converte un item dal formato DynamoDB a un dict di valori Python nativi (senza ricorsione)"""
+    result = dict.fromkeys(item)
+    _decode_attributes([(result, name, value) for name, value in item.items()])
+    return result
+
+def _encode_value(value):
+    """Restituisce (tag, payload, figli) per un valore Python; i figli vanno codificati a parte"""
+    if isinstance(value, bool):
+        return 'BOOL', value, None
+    if value is None:
+        return 'NULL', True, None
+    if isinstance(value, str):
+        return 'S', value, None
+    if isinstance(value, (int, float)) or type(value).__name__ == 'Decimal':
+        return 'N', str(value), None
+    if isinstance(value, (bytes, bytearray)):
+        return 'B', bytes(value), None
+    if isinstance(value, (set, frozenset)):
+        sample = next(iter(value), '')
+        if isinstance(sample, str):
+            return 'SS', sorted(value), None
+        if isinstance(sample, (bytes, bytearray)):
+            return 'BS', [bytes(v) for v in value], None
+        return 'NS', [str(v) for v in value], None
+    if isinstance(value, dict):
+        return 'M', dict.fromkeys(value), value.items()
+    if isinstance(value, (list, tuple)):
+        return 'L', [None] * len(value), enumerate(value)
+    raise TypeError(f"Tipo non convertibile in DynamoDB: {type(value).__name__}")
+
+def _encode_attributes(stack):
+    """Svuota uno stack di (contenitore, chiave, valore Python) codificando senza ricorsione"""
+    while stack:
+        target, slot, value = stack.pop()
+        tag, payload, children = _encode_value(value)
+        target[slot] = {tag: payload}
+        if children is not None:
+            stack.extend((payload, key, child) for key, child in children)
+
+def to_dynamodb(value):
+    """Converte un valore Python nel formato DynamoDB ({"S": ...}, {"M": ...})"""
+    result = [None]
+    _encode_attributes([(result, 0, value)])
+    return result[0]
+
+def serialize_dynamodb_item(item):
+    """Converte un dict di valori Python in un item nel formato DynamoDB (senza ricorsione)"""
+    result = dict.fromkeys(item)
+    _encode_attributes([(result, name, value) for name, value in item.items()])
+    return result
+
+@functools.lru_cache(maxsize=256)
+def compile_key_path(key_path):
+    """Compila una chiave con path separato da punti (es. "sw_thing_type.S") in un accessor riutilizzabile.
+
+    L'accessor restituito si usa come accessor(item, default=None); lo split del path avviene una sola volta.
+    """
+    keys = tuple(key_path.split('.'))
+
+    def accessor(item, default=None):
+        value = item
+        for key in keys:
+            try:
+                value = value[key]
+            except (KeyError, TypeError, IndexError):
+                return default
+        return value
+
+    return accessor
+
+def _json_default(value):
+    """Serializzazione JSON dei tipi restituiti da DynamoDB (Decimal, set, binary)"""
+    from decimal import Decimal
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if isinstance(value, (bytes, bytearray)) or hasattr(value, 'value'):
+        import base64
+        return base64.b64encode(bytes(getattr(value, 'value', value))).decode('ascii')
+    raise TypeError(f"Tipo non serializzabile in JSON: {type(value).__name__}")
+
+def export_dynamodb_table(table_name, output_path, deserialize=True, compress=None, columnar=False,
+                          row_group_size=10000, total_segments=1, projection_expression=None,
+                          filter_expression=None, expression_attribute_names=None, expression_attribute_values=None):
+    """Esporta una tabella in streaming su file JSON newline-delimited, a memoria costante.
+
+    Gli item arrivano da iter_dynamodb_items (scan paginata, parallela con total_segments > 1).
+    Con deserialize=True i descrittori di tipo DynamoDB vengono convertiti in valori nativi; con
+    compress (default: output_path termina con .gz) l'output è gzip. Con columnar=True ogni riga del
+    file è un row group colonnare {"rows": n, "columns": {attributo: [valori...]}} di al più
+    row_group_size item, adatto al caricamento in strumenti di analisi.
+    Restituisce il numero di item esportati.
+    """
+    if compress is None:
+        compress = str(output_path).endswith('.gz')
+    if compress:
+        import gzip
+        stream = gzip.open(output_path, 'wt', encoding='utf-8')
+    else:
+        stream = open(output_path, 'w', encoding='utf-8')
+
+    items = iter_dynamodb_items(table_name, projection_expression, filter_expression,
+                                expression_attribute_names, expression_attribute_values, total_segments)
+    if deserialize:
+        items = (deserialize_dynamodb_item(item) for item in items)
+
+    count = 0
+    with stream:
+        if not columnar:
+            for item in items:
+                stream.write(json.dumps(item, default=_json_default, ensure_ascii=False) + "\n")
+                count += 1
+            return count
+
+        for group in _batched(items, row_group_size):
+            names = sorted({name for item in group for name in item})
+            columns = {name: [item.get(name) for item in group] for name in names}
+            stream.write(json.dumps({'rows': len(group), 'columns': columns}, default=_json_default, ensure_ascii=False) + "\n")
+            count += len(group)
+    return count
+
+# Schema delle chiavi delle tabelle DynamoDB (DescribeTable), in cache per nome tabella
+_dynamodb_schema_lock = threading.Lock()
+_dynamodb_schemas = {}
+
+def describe_dynamodb_table(table_name, refresh=False):
+    """Restituisce (dalla cache, se disponibile) lo schema chiavi della tabella e dei suoi indici.
+
+    Formato: {'hash': ..., 'range': ..., 'indexes': {nome: {'hash', 'range', 'projection'}}}
+    """
+    schema = None if refresh else _dynamodb_schemas.get(table_name)
+    if schema is not None:
+        return schema
+
+    def _keys(key_schema):
+        keys = {key['KeyType']: key['AttributeName'] for key in key_schema}
+        return keys.get('HASH'), keys.get('RANGE')
+
+    table = get_aws_client('dynamodb').describe_table(TableName=table_name)['Table']
+    hash_key, range_key = _keys(table['KeySchema'])
+    schema = {'hash': hash_key, 'range': range_key, 'indexes': {}}
+    for index in table.get('GlobalSecondaryIndexes', []) + table.get('LocalSecondaryIndexes', []):
+        index_hash, index_range = _keys(index['KeySchema'])
+        schema['indexes'][index['IndexName']] = {
+            'hash': index_hash,
+            'range': index_range,
+            'projection': index.get('Projection', {}).get('ProjectionType', 'ALL'),
+        }
+    with _dynamodb_schema_lock:
+        _dynamodb_schemas[table_name] = schema
+    return schema
+
+def query_dynamodb_items(table_name, attribute, value, value_type="S", index_name=None):
+    """Trova gli item con attribute == value usando Query invece di una scan completa.
+
+    Usa la chiave della tabella se attribute ne è la partition key, altrimenti `index_name` o il primo
+    indice (con proiezione ALL) che ha attribute come partition key; solo in assenza di un indice adatto
+    ricade su una scan filtrata. Restituisce (items, report) con report = {'operation', 'index_name',
+    'consumed_capacity', 'pages'}.
+    """
+    dynamodb = get_aws_client('dynamodb')
+    params = {
+        'TableName': table_name,
+        'ExpressionAttributeNames': {'#k': attribute},
+        'ExpressionAttributeValues': {':v': {value_type: value}},
+        'ReturnConsumedCapacity': 'TOTAL',
+    }
+
+    schema = describe_dynamodb_table(table_name)
+    if index_name is None and schema['hash'] != attribute:
+        index_name = next((name for name, index in schema['indexes'].items()
+                           if index['hash'] == attribute and index['projection'] == 'ALL'), None)
+
+    if index_name is not None or schema['hash'] == attribute:
+        operation = 'Query'
+        params['KeyConditionExpression'] = '#k = :v'
+        if index_name is not None:
+            params['IndexName'] = index_name
+    else:
+        operation = 'Scan'
+        params['FilterExpression'] = '#k = :v'
+
+    items = []
+    report = {'operation': operation, 'index_name': index_name, 'consumed_capacity': 0.0, 'pages': 0}
+    for page in dynamodb.get_paginator(operation.lower()).paginate(**params):
+        items.extend(page.get('Items', []))
+        report['pages'] += 1
+        report['consumed_capacity'] += page.get('ConsumedCapacity', {}).get('CapacityUnits', 0.0)
+    return items, report
 
 def get_nested_value(d, path):
     for k in path:
@@ -919,15 +2395,16 @@ def get_nested_value(d, path):
 
 def select_entry(items, key_path="sw_thing_type.S"):
     """Seleziona un elemento da una lista. Usa inquirer se disponibile, altrimenti fallback numerico."""
-    path = key_path.split('.')
+    accessor = compile_key_path(key_path)
     labels = []
     for item in items:
-        value = get_nested_value(item, path)
+        value = accessor(item)
         label = value if value is not None else "N/A"
         labels.append(label)
 
     # Prova inquirer
-    if INQUIRER_AVAILABLE and labels:
+    inquirer = _get_inquirer()
+    if inquirer is not None and labels:
         try:
             questions = [inquirer.List('choice', message='Seleziona un elemento da visualizzare e/o modificare:', choices=labels, carousel=True)]
             answers = inquirer.prompt(questions)
@@ -949,8 +2426,10 @@ def select_entry(items, key_path="sw_thing_type.S"):
     return items[choice] if 0 <= choice < len(items) else None
 
 def select_thing_entry(items):
-    labels = [item.get('sw_thing_type', {}).get('S', 'N/A') for item in items]
-    if INQUIRER_AVAILABLE and labels:
+    accessor = compile_key_path('sw_thing_type.S')
+    labels = [accessor(item, 'N/A') for item in items]
+    inquirer = _get_inquirer()
+    if inquirer is not None and labels:
         try:
             questions = [inquirer.List('choice', message='Seleziona un elemento da visualizzare e/o modificare:', choices=labels, carousel=True)]
             answers = inquirer.prompt(questions)
@@ -970,7 +2449,11 @@ def select_thing_entry(items):
         return None
     return items[choice] if 0 <= choice < len(items) else None
 
-def choose_dynamodb_item(table_name, items):
+def choose_dynamodb_item(table_name, items=None, key_attribute=None, key_value=None, index_name=None):
+    # Se è nota la chiave (o il valore di un indice) si usa una Query invece della scan completa
+    if items is None and key_attribute is not None:
+        items, report = query_dynamodb_items(table_name, key_attribute, key_value, index_name=index_name)
+        print(f"{report['operation']} su {report['index_name'] or table_name}: {report['consumed_capacity']} RCU consumate")
     if not items:
         print("Nessun elemento trovato nella tabella.")
         return
@@ -991,31 +2474,293 @@ def choose_dynamodb_item(table_name, items):
 
 def get_or_create_nested(item, keys):
     """Ritorna (crea se non esiste) il dizionario annidato specificato da keys."""
-    if not keys:
-        return item
-    key = keys[0]
-    if key not in item:
-        item[key] = {}
-    return get_or_create_nested(item[key], keys[1:])
-
-def update_dynamodb_entry(table_name, item, new_entry_name, path_keys):
-    if not new_entry_name.strip():
-        print("Nessuna entry aggiunta. Operazione annullata.")
-        return
-
-    dynamodb = boto3.client("dynamodb")
+    for key in keys:
+        if key not in item:
+            item[key] = {}
+        item = item[key]
+    return item
+
+class MapEntryIndex:
+    """Indice incrementale di una mappa DynamoDB {nome: {"S": valore}}: valore massimo e nomi usati.
+
+    Viene costruito una sola volta per mappa e aggiornato a ogni add(), così l'allocazione del prossimo
+    valore e il controllo dei duplicati costano O(1). Le modifiche fatte alla mappa senza passare da add()
+    non vengono viste: dopo averla modificata va chiamata invalidate_map_entry_index().
+    """
 
+    def __init__(self, map_dict):
+        self.map = map_dict
+        self.names = set(map_dict)
+        values = [int(v["S"]) for v in map_dict.values() if "S" in v]
+        self.max_value = max(values) if values else 0
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def next_value(self):
+        return str(self.max_value + 1)
+
+    def add(self, name, value=None):
+        """Aggiunge name alla mappa (con il prossimo valore, se non indicato) e restituisce il valore"""
+        value = value if value is not None else self.next_value()
+        self.map[name] = {"S": value}
+        self.names.add(name)
+        self.max_value = max(self.max_value, int(value))
+        return value
+
+# Indici delle mappe già visitate (LRU limitata, per identità della mappa)
+MAP_ENTRY_INDEX_CACHE_SIZE = 1024
+_map_entry_indexes = OrderedDict()
+_map_entry_indexes_lock = threading.Lock()
+
+def get_map_entry_index(map_dict):
+    """Restituisce l'indice della mappa in O(1), costruendolo alla prima richiesta.
+
+    L'indice è considerato valido finché la mappa cambia solo tramite add(): chi la modifica in altro modo
+    (rimozioni, valori riscritti, contenuto sostituito) deve chiamare invalidate_map_entry_index(). Come
+    rete di sicurezza l'indice viene ricostruito se il numero di entry non torna.
+    """
+    key = id(map_dict)
+    with _map_entry_indexes_lock:
+        index = _map_entry_indexes.get(key)
+        if index is None or index.map is not map_dict or len(index.names) != len(map_dict):
+            index = MapEntryIndex(map_dict)
+            _map_entry_indexes[key] = index
+            if len(_map_entry_indexes) > MAP_ENTRY_INDEX_CACHE_SIZE:
+                _map_entry_indexes.popitem(last=False)
+        _map_entry_indexes.move_to_end(key)
+        return index
+
+def invalidate_map_entry_index(map_dict):
+    """Scarta l'indice di una mappa: va chiamata dopo ogni modifica della mappa fatta senza add()"""
+    with _map_entry_indexes_lock:
+        _map_entry_indexes.pop(id(map_dict), None)
+
+def _map_entry_index_for(item, path_keys):
     # Naviga (o crea) i livelli richiesti (es. ["CP_map","M"] o ["CP_list","Entry","N"]) 
     sub_dict = get_or_create_nested(item, path_keys)
 
     # Qui si assume che l'ultimo livello contenga una struttura "M" per la mappa
     if "M" not in sub_dict:
         sub_dict["M"] = {}
+    return get_map_entry_index(sub_dict["M"])
 
-    map_dict = sub_dict["M"]
-    values = [int(v["S"]) for v in map_dict.values() if "S" in v]
-    new_value = str(max(values) + 1) if values else "1"
+def _add_map_entry(item, new_entry_name, path_keys):
+    """Aggiunge new_entry_name alla mappa in path_keys con valore max+1 e restituisce il nuovo valore
+    (None se l'entry è già presente)"""
+    index = _map_entry_index_for(item, path_keys)
+    if new_entry_name in index:
+        return None
+    return index.add(new_entry_name)
 
-    map_dict[new_entry_name] = {"S": new_value}
+def update_dynamodb_entry(table_name, item, new_entry_name, path_keys, atomic=False, counter_attribute=None,
+                          version_attribute=None):
+    if not new_entry_name.strip():
+        print("Nessuna entry aggiunta. Operazione annullata.")
+        return
+
+    index = _map_entry_index_for(item, path_keys)
+    if new_entry_name in index:
+        print(f"Entry {new_entry_name} già presente. Operazione annullata.")
+        return
+
+    # Percorso UpdateItem: scrive solo la nuova entry, con controllo di concorrenza
+    if atomic or counter_attribute or version_attribute:
+        new_value = update_dynamodb_entry_atomic(table_name, item, new_entry_name, path_keys, counter_attribute,
+                                                 version_attribute=version_attribute)
+        if new_value is None:
+            print(f"Entry {new_entry_name} già presente. Operazione annullata.")
+        else:
+            print(f"Aggiunta nuova entry: {new_entry_name} con valore {new_value}")
+        return
+
+    dynamodb = get_aws_client("dynamodb")
+
+    new_value = index.add(new_entry_name)
     dynamodb.put_item(TableName=table_name, Item=item)
-    print(f"Aggiunta nuova entry: {new_entry_name} con valore {new_value}")
\ No newline at end of file
+    print(f"Aggiunta nuova entry: {new_entry_name} con valore {new_value}")
+
+def _dynamodb_primary_key(table_name, item):
+    """Estrae dall'item gli attributi della chiave primaria della tabella"""
+    schema = describe_dynamodb_table(table_name)
+    return {name: item[name] for name in (schema['hash'], schema['range']) if name}
+
+def update_dynamodb_entry_atomic(table_name, item, new_entry_name, path_keys, counter_attribute=None, max_attempts=5,
+                                 version_attribute=None):
+    """Aggiunge new_entry_name alla mappa in path_keys con UpdateItem, senza riscrivere l'intero item.
+
+    path_keys segue il formato di update_dynamodb_entry (i livelli "M" vengono ignorati nel document path).
+    Senza counter_attribute il valore max+1 è calcolato sulla mappa letta e la scrittura è condizionata
+    (optimistic concurrency) all'assenza dell'entry e alla dimensione della mappa oppure, con
+    version_attribute, al numero di versione dell'item, incrementato a ogni scrittura: se un altro writer
+    l'ha modificata la mappa viene riletta e l'operazione ritentata, fino a max_attempts volte. La sola
+    dimensione non vede una rimozione seguita da un'aggiunta concorrente, che può portare a valori
+    duplicati: per tabelle con più writer è consigliato version_attribute. Con counter_attribute il valore
+    è allocato da un contatore atomico nell'item (inizializzato al massimo corrente).
+    L'item locale viene aggiornato e il nuovo valore restituito (None se l'entry è già presente).
+    """
+    from botocore.exceptions import ClientError
+
+    dynamodb = get_aws_client("dynamodb")
+    key = _dynamodb_primary_key(table_name, item)
+    segments = [k for k in path_keys if k != "M"]
+    names = {f"#p{i}": name for i, name in enumerate(segments)}
+    map_path = ".".join(names)
+    names["#e"] = new_entry_name
+
+    index = _map_entry_index_for(item, path_keys)
+    map_dict = index.map
+    if new_entry_name in index:
+        return None
+
+    if counter_attribute:
+        # Nella stessa scrittura la mappa viene creata se manca: SET map.#e su una mappa inesistente
+        # fallirebbe con ValidationException dopo aver già consumato un valore del contatore
+        counter_names = {k: v for k, v in names.items() if k != "#e"}
+        counter_names["#c"] = counter_attribute
+        response = dynamodb.update_item(
+            TableName=table_name, Key=key,
+            UpdateExpression=f"SET #c = if_not_exists(#c, :start) + :one, {map_path} = if_not_exists({map_path}, :empty)",
+            ExpressionAttributeNames=counter_names,
+            ExpressionAttributeValues={":start": {"N": str(index.max_value)}, ":one": {"N": "1"}, ":empty": {"M": {}}},
+            ReturnValues="UPDATED_NEW",
+        )
+        new_value = response["Attributes"][counter_attribute]["N"]
+        item[counter_attribute] = {"N": new_value}
+        try:
+            dynamodb.update_item(
+                TableName=table_name, Key=key,
+                UpdateExpression=f"SET {map_path}.#e = :v",
+                ConditionExpression=f"attribute_not_exists({map_path}.#e)",
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={":v": {"S": new_value}},
+            )
+        except ClientError as e:
+            # L'entry è stata aggiunta nel frattempo da un altro writer
+            if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                raise
+            return None
+        return index.add(new_entry_name, new_value)
+
+    map_names = {k: v for k, v in names.items() if k != "#e"}
+    if version_attribute:
+        map_names["#ver"] = version_attribute
+
+    for attempt in range(1, max_attempts + 1):
+        index = get_map_entry_index(map_dict)
+        if new_entry_name in index:
+            return None
+        new_value = index.next_value()
+        if map_dict:
+            update = f"SET {map_path}.#e = :v"
+            condition = f"attribute_not_exists({map_path}.#e) AND size({map_path}) = :n"
+            values_expr = {":v": {"S": new_value}, ":n": {"N": str(len(map_dict))}}
+            expression_names = dict(names)
+        else:
+            update = f"SET {map_path} = :m"
+            condition = f"(attribute_not_exists({map_path}) OR size({map_path}) = :zero)"
+            values_expr = {":m": {"M": {new_entry_name: {"S": new_value}}}, ":zero": {"N": "0"}}
+            expression_names = {k: v for k, v in names.items() if k != "#e"}
+        version = None
+        if version_attribute:
+            # La versione cambia a ogni scrittura: copre anche rimozioni e aggiunte che lasciano invariata la dimensione
+            version = item.get(version_attribute, {}).get("N")
+            update += ", #ver = if_not_exists(#ver, :zero) + :one"
+            values_expr.update({":zero": {"N": "0"}, ":one": {"N": "1"}})
+            expression_names["#ver"] = version_attribute
+            if version is None:
+                condition += " AND attribute_not_exists(#ver)"
+            else:
+                condition += " AND #ver = :ver"
+                values_expr[":ver"] = {"N": version}
+        try:
+            dynamodb.update_item(
+                TableName=table_name, Key=key,
+                UpdateExpression=update, ConditionExpression=condition,
+                ExpressionAttributeNames=expression_names, ExpressionAttributeValues=values_expr,
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException" or attempt == max_attempts:
+                raise
+            # Un altro writer ha modificato la mappa: la rileggiamo (solo la mappa) e ritentiamo
+            fresh = dynamodb.get_item(
+                TableName=table_name, Key=key, ConsistentRead=True,
+                ProjectionExpression=f"{map_path}, #ver" if version_attribute else map_path,
+                ExpressionAttributeNames=map_names,
+            ).get("Item", {})
+            map_dict.clear()
+            map_dict.update(get_nested_value(fresh, path_keys + ["M"]) or {})
+            invalidate_map_entry_index(map_dict)
+            if version_attribute:
+                if version_attribute in fresh:
+                    item[version_attribute] = fresh[version_attribute]
+                else:
+                    item.pop(version_attribute, None)
+            continue
+        if version_attribute:
+            item[version_attribute] = {"N": str(int(version or 0) + 1)}
+        return index.add(new_entry_name, new_value)
+
+# Numero massimo di richieste per singola BatchWriteItem
+DYNAMODB_BATCH_WRITE_SIZE = 25
+
+def bulk_update_dynamodb_entries(table_name, updates, max_workers=4, retries=5, backoff=0.5):
+    """Applica molte aggiunte (item, new_entry_name, path_keys) con il minimo numero di scritture.
+
+    Le entry destinate allo stesso item (stessa chiave primaria) vengono applicate in sequenza e
+    producono una sola scrittura; gli item risultanti sono inviati con BatchWriteItem (25 per richiesta,
+    batch in parallelo), ritentando gli UnprocessedItems con backoff esponenziale.
+    Le entry già presenti nella mappa vengono saltate e riportate in 'duplicates'.
+    Restituisce un report con entry aggiunte, duplicati, item scritti, batch, item non scritti ed errori AWS
+    dei batch falliti ('errors'); gli errori non AWS (es. di programmazione) vengono propagati.
+    """
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    schema = describe_dynamodb_table(table_name)
+    key_names = [name for name in (schema['hash'], schema['range']) if name]
+
+    # Coalesce: una sola versione finale per ogni chiave primaria
+    pending = {}
+    report = {'entries': [], 'duplicates': [], 'written': 0, 'batches': 0, 'unprocessed': [], 'errors': []}
+    for item, new_entry_name, path_keys in updates:
+        if not new_entry_name.strip():
+            continue
+        item_key = json.dumps({name: item.get(name) for name in key_names}, sort_keys=True)
+        target = pending.setdefault(item_key, item)
+        new_value = _add_map_entry(target, new_entry_name, path_keys)
+        if new_value is None:
+            report['duplicates'].append({'item_key': item_key, 'entry': new_entry_name})
+            continue
+        report['entries'].append({'item_key': item_key, 'entry': new_entry_name, 'value': new_value})
+
+    dynamodb = get_aws_client('dynamodb', max_pool_connections=max_workers)
+
+    def _write_batch(items):
+        requests = {table_name: [{'PutRequest': {'Item': it}} for it in items]}
+        attempt = 0
+        error = None
+        while requests:
+            attempt += 1
+            try:
+                response, _ = _call_with_retries(lambda: dynamodb.batch_write_item(RequestItems=requests), retries, backoff)
+            except (ClientError, BotoCoreError) as e:
+                # Throttling esaurito, validazione, permessi...: gli item restano non scritti e l'errore va nel report
+                error = str(e)
+                break
+            requests = response.get('UnprocessedItems') or {}
+            if not requests or attempt > retries:
+                break
+            time.sleep(random.uniform(0, backoff * (2 ** (attempt - 1))))
+        unprocessed = [req['PutRequest']['Item'] for req in requests.get(table_name, [])]
+        return len(items) - len(unprocessed), unprocessed, error
+
+    batches = list(_batched(pending.values(), DYNAMODB_BATCH_WRITE_SIZE))
+    if batches:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+            for written, unprocessed, error in executor.map(_write_batch, batches):
+                report['batches'] += 1
+                report['written'] += written
+                report['unprocessed'].extend(unprocessed)
+                if error:
+                    report['errors'].append(error)
+    return report
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+⚡ Front-end asyncio per gli helper S3 e DynamoDB di mylib
+=========================================================
+
+Versioni asincrone di listing S3 paginato, download/upload concorrenti e scan DynamoDB,
+con le stesse firme (per quanto possibile) e gli stessi esiti delle funzioni di mylib.
+
+Con aiobotocore installato le chiamate AWS sono realmente non bloccanti: un solo thread
+gestisce centinaia di richieste contemporanee. Senza aiobotocore le chiamate vengono
+eseguite sui client boto3 condivisi di mylib nel pool di thread del loop. In entrambi i
+casi la concorrenza è limitata da un semaforo (parametri `concurrency`/`semaphore`).
+
+Esempio:
+    from library import mylib_async
+
+    async def main():
+        objects, _, _ = await mylib_async.getFileListSortedByCount('bucket', 'export', None, 'CP', 50)
+        results = await mylib_async.downloadFilesFromS3('bucket', [o['Key'] for o in objects], 'out')
+        async for item in mylib_async.iter_dynamodb_items('table', total_segments=4):
+            ...
+        await mylib_async.close_async_clients()
+"""
+
+import asyncio
+import functools
+import heapq
+import itertools
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+try:
+    from . import mylib
+except ImportError:
+    import mylib
+
+# Richieste AWS contemporanee di default per singola chiamata (o per semaforo condiviso)
+DEFAULT_CONCURRENCY = int(os.environ.get('MYLIB_ASYNC_CONCURRENCY', '64'))
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+_AIOBOTOCORE_MISSING = object()
+_aiobotocore_session = None
+
+
+def _get_aiobotocore_session():
+    """Sessione aiobotocore condivisa; None se il pacchetto non è installato"""
+    global _aiobotocore_session
+    if _aiobotocore_session is None:
+        try:
+            from aiobotocore.session import get_session
+            _aiobotocore_session = get_session()
+        except ImportError:
+            _aiobotocore_session = _AIOBOTOCORE_MISSING
+    return None if _aiobotocore_session is _AIOBOTOCORE_MISSING else _aiobotocore_session
+
+
+# Client aiobotocore condivisi: uno per (servizio, regione, pool, identità delle credenziali) e per event
+# loop, dato che le connessioni aiohttp appartengono al loop che le ha create
+_native_clients = {}    # loop -> {chiave: (contesto, client)}
+_native_locks = {}      # loop -> asyncio.Lock per la creazione dei client
+
+
+def _aiobotocore_credentials():
+    """Credenziali auto-rinnovate di mylib (enable_auto_refresh_credentials) adattate ad aiobotocore;
+    None se non attive (vale la catena di default: variabili d'ambiente, profilo, ...)"""
+    credentials = mylib._refreshable_credentials
+    if credentials is None:
+        return None
+    from aiobotocore.credentials import AioRefreshableCredentials
+
+    async def _refresh():
+        # Il rinnovo di mylib è sincrono (cache su disco, SSO non interattivo): va nel pool di thread
+        frozen = await asyncio.get_running_loop().run_in_executor(None, credentials.get_frozen_credentials)
+        return {
+            'access_key': frozen.access_key,
+            'secret_key': frozen.secret_key,
+            'token': frozen.token,
+            'expiry_time': credentials._expiry_time.isoformat(),
+        }
+
+    frozen = credentials.get_frozen_credentials()
+    return AioRefreshableCredentials.create_from_metadata(
+        {'access_key': frozen.access_key, 'secret_key': frozen.secret_key, 'token': frozen.token,
+         'expiry_time': credentials._expiry_time.isoformat()},
+        refresh_using=_refresh, method='mylib-sso',
+        advisory_timeout=mylib.CREDENTIAL_ADVISORY_REFRESH,
+        mandatory_timeout=mylib.CREDENTIAL_MANDATORY_REFRESH,
+    )
+
+
+async def _get_native_client(session, service, region_name, pool):
+    """Client aiobotocore condiviso dal loop corrente, creato alla prima richiesta"""
+    from aiobotocore.config import AioConfig
+
+    loop = asyncio.get_running_loop()
+    identity = mylib._credentials_identity()
+    key = (service, region_name, pool, identity)
+    clients = _native_clients.setdefault(loop, {})
+    if key in clients:
+        return clients[key][1]
+    lock = _native_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        if key not in clients:
+            # I client dei loop già chiusi e quelli con credenziali non più correnti non servono più
+            for closed_loop in [l for l in _native_clients if l is not loop and l.is_closed()]:
+                _native_clients.pop(closed_loop, None)
+                _native_locks.pop(closed_loop, None)
+            for stale in [k for k in clients if k[3] != identity]:
+                context, _ = clients.pop(stale)
+                await context.__aexit__(None, None, None)
+            # None fa rileggere alla sessione la catena di default, con le credenziali correnti
+            session._credentials = _aiobotocore_credentials()
+            context = session.create_client(service, region_name=region_name,
+                                            config=AioConfig(max_pool_connections=pool))
+            clients[key] = (context, await context.__aenter__())
+        return clients[key][1]
+
+
+async def close_async_clients():
+    """Chiude i client aiobotocore condivisi del loop corrente (da chiamare prima di chiudere il loop)"""
+    loop = asyncio.get_running_loop()
+    clients = _native_clients.pop(loop, {})
+    _native_locks.pop(loop, None)
+    for context, _ in clients.values():
+        await context.__aexit__(None, None, None)
+
+
+class AsyncClient:
+    """Client AWS asincrono da usare come `async with AsyncClient('s3') as client`.
+
+    Usa aiobotocore se disponibile, con un client condiviso per servizio, regione e pool (come
+    get_aws_client) e le credenziali risolte da mylib; altrimenti esegue le operazioni del client
+    boto3 condiviso (get_aws_client) nel pool di thread del loop. `native` indica quale dei due è in uso.
+    """
+
+    def __init__(self, service, region_name=None, max_pool_connections=None):
+        self.service = service
+        self.region_name = region_name
+        self.max_pool_connections = max(max_pool_connections or 0, mylib.MAX_POOL_CONNECTIONS)
+        self.native = False
+        self._client = None
+
+    async def __aenter__(self):
+        session = _get_aiobotocore_session()
+        if session is None:
+            self._client = mylib.get_aws_client(self.service, self.region_name, self.max_pool_connections)
+            return self
+        mylib._load_env()
+        region_name = self.region_name or os.environ.get('AWS_DEFAULT_REGION') or os.environ.get('AWS_REGION')
+        self._client = await _get_native_client(session, self.service, region_name, self.max_pool_connections)
+        # Registrazione idempotente: segue anche le attivazioni/disattivazioni successive alla creazione
+        mylib._instrument_client(self._client, enable=mylib._instrumentation_enabled)
+        self.native = True
+        return self
+
+    async def __aexit__(self, *exc_info):
+        # Il client resta aperto per le operazioni successive: si chiude con close_async_clients()
+        self._client = None
+
+    async def call(self, operation, **params):
+        """Esegue un'operazione AWS (es. 'list_objects_v2') e ne restituisce la risposta"""
+        method = getattr(self._client, operation)
+        if self.native:
+            return await method(**params)
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(method, **params))
+
+    async def run_sync(self, operation, *args, **kwargs):
+        """Esegue un metodo del client boto3 sincrono (es. download_file) nel pool di thread del loop"""
+        method = getattr(self._client, operation)
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(method, *args, **kwargs))
+
+
+@asynccontextmanager
+async def _client_scope(client, service, max_pool_connections=None):
+    """Usa il client passato dal chiamante oppure ne apre uno per la durata dell'operazione"""
+    if client is not None:
+        yield client
+        return
+    async with AsyncClient(service, max_pool_connections=max_pool_connections) as new_client:
+        yield new_client
+
+
+def _semaphore(semaphore, concurrency):
+    return semaphore or asyncio.Semaphore(concurrency or DEFAULT_CONCURRENCY)
+
+
+async def _call_with_retries(func, retries=3, backoff=0.5):
+    """Versione asincrona di mylib._call_with_retries: restituisce (risultato, tentativi)"""
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return await func(), attempt
+        except Exception as e:
+            if attempt > retries or not mylib._is_transient_error(e):
+                e.mylib_attempts = attempt
+                raise
+            await asyncio.sleep(random.uniform(0, backoff * (2 ** (attempt - 1))))
+
+
+# ---------------------------------------------------------------------------
+# Listing S3
+# ---------------------------------------------------------------------------
+
+async def iterS3Objects(bucket, prefix, filter="", since=None, client=None, page_size=None):
+    """Generatore asincrono sugli oggetti S3 sotto `prefix`, pagina per pagina (come mylib.iterS3Objects)"""
+    async with _client_scope(client, 's3') as s3:
+        params = {'Bucket': bucket, 'Prefix': prefix}
+        if page_size:
+            params['MaxKeys'] = page_size
+        while True:
+            page = await s3.call('list_objects_v2', **params)
+            for obj in mylib.filterFileList(page, filter or ""):
+                if mylib._isRecentObject(obj, since):
+                    yield obj
+            if not page.get('IsTruncated'):
+                return
+            params['ContinuationToken'] = page['NextContinuationToken']
+
+
+async def listS3Objects(bucket, prefixes, filter="", since=None, max_files=None, concurrency=None,
+                        semaphore=None, client=None):
+    """Lista in concorrenza uno o più prefissi e restituisce gli oggetti dal più recente (primi max_files).
+
+    filter e since sono applicati pagina per pagina e, con max_files, gli oggetti passano da un heap
+    limitato condiviso tra i prefissi: in memoria restano al più max_files oggetti.
+    """
+    if isinstance(prefixes, str):
+        prefixes = [prefixes]
+    if max_files is not None and max_files <= 0:
+        return []
+    semaphore = _semaphore(semaphore, concurrency)
+    newest = []     # heap (LastModified, progressivo, oggetto) dei max_files oggetti più recenti
+    counter = itertools.count()
+
+    async with _client_scope(client, 's3', concurrency) as s3:
+        async def _list(prefix):
+            async with semaphore:
+                async for obj in iterS3Objects(bucket, prefix, filter, since, s3):
+                    entry = (obj['LastModified'], next(counter), obj)
+                    if max_files is None or len(newest) < max_files:
+                        heapq.heappush(newest, entry)
+                    elif entry[0] > newest[0][0]:
+                        heapq.heapreplace(newest, entry)
+
+        await asyncio.gather(*(_list(prefix) for prefix in prefixes))
+    return [obj for _, _, obj in sorted(newest, key=lambda e: (e[0], -e[1]), reverse=True)]
+
+
+async def getFileListSortedByDate(bucket, folderKey, subFolderKey, filter, num_days, max_files=None, client=None):
+    """Versione non interattiva di mylib.getFileListSortedByDate: oggetti degli ultimi num_days giorni
+    (default 10), dal più recente. Restituisce (oggetti, num_days, numero di oggetti)."""
+    if subFolderKey is not None:
+        folderKey = f"{folderKey}/{subFolderKey}"
+    num_days = 10 if num_days is None or str(num_days).strip() == "" else int(num_days)
+    since = datetime.now(timezone.utc) - timedelta(days=num_days)
+    recent_objects = await listS3Objects(bucket, folderKey, filter or "", since, max_files, client=client)
+    return recent_objects, num_days, len(recent_objects)
+
+
+async def getFileListSortedByCount(bucket, folderKey, subFolderKey, filter, num_files, client=None):
+    """Versione non interattiva di mylib.getFileListSortedByCount: i num_files oggetti più recenti
+    (default 10). Restituisce (oggetti, num_files, numero di oggetti)."""
+    if subFolderKey is not None:
+        folderKey = f"{folderKey}/{subFolderKey}"
+    num_files = 10 if num_files is None or str(num_files).strip() == "" else int(num_files)
+    recent_objects = await listS3Objects(bucket, folderKey, filter or "", None, num_files, client=client)
+    return recent_objects, num_files, len(recent_objects)
+
+
+# ---------------------------------------------------------------------------
+# Download / upload S3
+# ---------------------------------------------------------------------------
+
+async def _stream_object(s3, bucket, key, local_path):
+    """Scarica un oggetto in streaming (aiobotocore) senza tenerlo in memoria"""
+    response = await s3.call('get_object', Bucket=bucket, Key=key)
+    body = response['Body']
+    tmp_path = f"{local_path}.part"
+    try:
+        with open(tmp_path, 'wb') as f:
+            while True:
+                chunk = await body.read(DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+        os.replace(tmp_path, local_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    finally:
+        body.close()
+
+
+async def downloadFileFromS3(bucket, key, local_path, client=None, retries=3, backoff=0.5):
+    """Scarica una chiave in local_path e restituisce l'esito
+    (chiavi: key, bucket, file, success, bytes, seconds, attempts, error)"""
+    result = {'key': key, 'bucket': bucket, 'file': local_path, 'success': False, 'bytes': 0, 'seconds': 0.0, 'attempts': 0, 'error': None}
+    start = time.perf_counter()
+    async with _client_scope(client, 's3') as s3:
+        if s3.native:
+            download = lambda: _stream_object(s3, bucket, key, local_path)
+        else:
+            download = lambda: s3.run_sync('download_file', bucket, key, local_path, Config=mylib.getTransferConfig())
+        try:
+            _, result['attempts'] = await _call_with_retries(download, retries, backoff)
+            result['bytes'] = os.path.getsize(local_path)
+            result['success'] = True
+        except Exception as e:
+            result['attempts'] = getattr(e, 'mylib_attempts', result['attempts'])
+            result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+async def downloadFilesFromS3(bucket, path_list, local_dir=".", concurrency=None, semaphore=None,
+                              retries=3, backoff=0.5, client=None, prefix=None):
+    """Scarica in concorrenza le chiavi di path_list in local_dir (come mylib.downloadFilesFromS3).
+
+    Ogni file mantiene il path della chiave relativo a prefix (default: la directory comune a tutte le
+    chiavi); chiavi ripetute vengono scaricate una sola volta.
+    Restituisce un esito per chiave, nello stesso ordine di path_list.
+    """
+    keys = list(path_list or [])
+    if not keys:
+        return []
+    os.makedirs(local_dir, exist_ok=True)
+    local_paths = mylib._local_download_paths(keys, local_dir, prefix)
+    semaphore = _semaphore(semaphore, concurrency)
+
+    async with _client_scope(client, 's3', concurrency) as s3:
+        async def _download(key):
+            local_path = local_paths[key]
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            async with semaphore:
+                return await downloadFileFromS3(bucket, key, local_path, s3, retries, backoff)
+
+        unique_keys = list(dict.fromkeys(keys))
+        results = dict(zip(unique_keys, await asyncio.gather(*(_download(key) for key in unique_keys))))
+    return [dict(results[key]) for key in keys]
+
+
+async def _multipart_upload(s3, local_file, bucket, key, size):
+    """Upload multipart (aiobotocore) a chunk di TRANSFER_MULTIPART_CHUNKSIZE, annullato in caso di errore"""
+    upload_id = (await s3.call('create_multipart_upload', Bucket=bucket, Key=key))['UploadId']
+    parts = []
+    try:
+        with open(local_file, 'rb') as f:
+            for part_number in range(1, size // mylib.TRANSFER_MULTIPART_CHUNKSIZE + 2):
+                chunk = f.read(mylib.TRANSFER_MULTIPART_CHUNKSIZE)
+                if not chunk:
+                    break
+                response = await s3.call('upload_part', Bucket=bucket, Key=key, UploadId=upload_id,
+                                         PartNumber=part_number, Body=chunk)
+                parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        await s3.call('complete_multipart_upload', Bucket=bucket, Key=key, UploadId=upload_id,
+                      MultipartUpload={'Parts': parts})
+    except BaseException:
+        await s3.call('abort_multipart_upload', Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+
+async def uploadToS3(local_file, bucket, subfolder, client=None):
+    """Carica un singolo file su S3 e ne restituisce l'esito
+    (chiavi: file, bucket, key, success, bytes, seconds, error)"""
+    remote_file = os.path.basename(local_file)
+    key = f"{subfolder}/{remote_file}" if subfolder else remote_file
+
+    result = {'file': local_file, 'bucket': bucket, 'key': key, 'success': False, 'bytes': 0, 'seconds': 0.0, 'error': None}
+    start = time.perf_counter()
+    async with _client_scope(client, 's3') as s3:
+        try:
+            size = os.path.getsize(local_file)
+            if not s3.native:
+                await s3.run_sync('upload_file', local_file, bucket, key, Config=mylib.getTransferConfig())
+            elif size >= mylib.TRANSFER_MULTIPART_THRESHOLD:
+                await _multipart_upload(s3, local_file, bucket, key, size)
+            else:
+                with open(local_file, 'rb') as f:
+                    await s3.call('put_object', Bucket=bucket, Key=key, Body=f.read())
+            result['bytes'] = size
+            result['success'] = True
+        except Exception as e:
+            result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+async def uploadFileToS3(local_files, bucket, subfolder, singleFile=None, concurrency=None, semaphore=None, client=None):
+    """Carica in concorrenza uno o più file su S3 (come mylib.uploadFileToS3), un esito per file"""
+    files = [singleFile] if singleFile is not None else list(local_files or [])
+    if not files:
+        return []
+    semaphore = _semaphore(semaphore, concurrency)
+
+    async with _client_scope(client, 's3', concurrency) as s3:
+        async def _upload(local_file):
+            async with semaphore:
+                return await uploadToS3(local_file, bucket, subfolder, s3)
+
+        return list(await asyncio.gather(*(_upload(local_file) for local_file in files)))
+
+
+# ---------------------------------------------------------------------------
+# Scan DynamoDB
+# ---------------------------------------------------------------------------
+
+async def _scan_pages(dynamodb, params, segment=None, total_segments=None):
+    """Pagine di una scan (eventualmente di un solo segmento), seguendo LastEvaluatedKey"""
+    params = dict(params)
+    if segment is not None:
+        params.update(Segment=segment, TotalSegments=total_segments)
+    while True:
+        page = await dynamodb.call('scan', **params)
+        yield page.get('Items', [])
+        if 'LastEvaluatedKey' not in page:
+            return
+        params['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+
+async def iter_dynamodb_items(table_name, projection_expression=None, filter_expression=None,
+                              expression_attribute_names=None, expression_attribute_values=None,
+                              total_segments=1, page_size=None, client=None):
+    """Generatore asincrono sugli item di una tabella DynamoDB (come mylib.iter_dynamodb_items).
+
+    Con total_segments > 1 i segmenti della parallel scan girano come task concorrenti e depositano
+    le pagine in una coda limitata; l'ordine degli item non è deterministico.
+    """
+    params = mylib._dynamodb_scan_params(table_name, projection_expression, filter_expression,
+                                         expression_attribute_names, expression_attribute_values)
+    if page_size:
+        params['Limit'] = page_size
+
+    async with _client_scope(client, 'dynamodb', total_segments) as dynamodb:
+        if total_segments <= 1:
+            async for items in _scan_pages(dynamodb, params):
+                for item in items:
+                    yield item
+            return
+
+        pages = asyncio.Queue(maxsize=2 * total_segments)
+        done = object()
+
+        async def _scan_segment(segment):
+            # Alla cancellazione (consumatore interrotto) il task termina senza altri put sulla coda
+            try:
+                async for items in _scan_pages(dynamodb, params, segment, total_segments):
+                    await pages.put(items)
+            except Exception as e:
+                await pages.put(e)
+            await pages.put(done)
+
+        tasks = [asyncio.ensure_future(_scan_segment(segment)) for segment in range(total_segments)]
+        try:
+            remaining = total_segments
+            while remaining:
+                value = await pages.get()
+                if value is done:
+                    remaining -= 1
+                elif isinstance(value, Exception):
+                    raise value
+                else:
+                    for item in value:
+                        yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def get_dynamodb_items(table_name, projection_expression=None, filter_expression=None,
+                             expression_attribute_names=None, expression_attribute_values=None,
+                             total_segments=1, client=None):
+    """Restituisce tutti gli item della tabella (scan paginata, opzionalmente parallela)"""
+    return [item async for item in iter_dynamodb_items(table_name, projection_expression, filter_expression,
+                                                       expression_attribute_names, expression_attribute_values,
+                                                       total_segments, client=client)]
@@ -12,6 +12,11 @@ import os
 import sys
 from pathlib import Path
 
+try:
+    from . import env_loader
+except ImportError:
+    import env_loader
+
 def find_aws_sso_path():
     """Trova automaticamente il path di aws-sso-credential-manager"""
     common_paths = [
@@ -108,6 +113,8 @@ def create_env_file(aws_sso_path):
         f.write('# Generato automaticamente da setup_aws_sso.py\n')
         f.write(f'AWS_SSO_CREDENTIAL_MANAGER_PATH={aws_sso_path}\n')
 
+    env_loader.invalidate()
+
     print(f"✅ File .env creato in: {env_file_path}")
     print(f"📂 Directory del progetto: {project_root}")
     return str(env_file_path)
@@ -145,19 +152,7 @@ def run_setup():
     project_root = library_dir.parent
     env_file_path = project_root / '.env'
     
-    current_configured_path = None
-    if env_file_path.exists():
-        try:
-            with open(env_file_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        if key.strip() == 'AWS_SSO_CREDENTIAL_MANAGER_PATH':
-                            current_configured_path = value.strip()
-                            break
-        except Exception:
-            pass
+    current_configured_path = env_loader.parse_env_file(str(env_file_path)).get('AWS_SSO_CREDENTIAL_MANAGER_PATH')
     
     if current_configured_path:
         print(f"📄 Configurazione esistente trovata: {current_configured_path}")